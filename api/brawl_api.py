@@ -1,18 +1,63 @@
 # api/brawl_api.py
 import os
-import requests
-from dotenv import load_dotenv
+from api.client import request_conditional, request_json_sync
+from api.cache import ResponseCache, cache_ttl
+from api.rate_limiter import INTERACTIVE
 
-load_dotenv()
-BRAWL_API_TOKEN = os.getenv("BRAWL_API_TOKEN")
-HEADERS = {"Authorization": f"Bearer {BRAWL_API_TOKEN}"}
+# TTL кэша по эндпоинтам (сек) и размер кэша
+PLAYER_TTL = float(os.getenv("BRAWL_PLAYER_TTL", "60"))
+CLUB_MEMBERS_TTL = float(os.getenv("BRAWL_CLUB_MEMBERS_TTL", "60"))
+CACHE_SIZE = int(os.getenv("BRAWL_CACHE_SIZE", "2000"))
 
+response_cache = ResponseCache(CACHE_SIZE)
+
+def player_path(tag: str) -> str:
+    return f"/players/%23{tag}"
+
+def club_members_path(tag: str) -> str:
+    return f"/clubs/%23{tag}/members"
+
+async def _revalidate(path: str, ttl: float, priority: int):
+    entry = response_cache.get(path)
+    status, data, headers = await request_conditional(path, entry.etag if entry else None, priority)
+    if status == 304 and entry is not None:
+        data = entry.value
+    ttl = cache_ttl(headers, ttl)
+    if ttl is None:
+        response_cache.discard(path)
+    else:
+        response_cache.put(path, data, ttl, headers.get("etag"))
+    return data
+
+async def cached_get(path: str, ttl: float, priority: int = INTERACTIVE):
+    """
+    GET через кэш: свежий ответ — из памяти, иначе один общий (условный) запрос на ключ.
+    """
+    entry = response_cache.get(path)
+    if entry is not None and entry.is_fresh():
+        return entry.value
+    return await response_cache.single_flight(path, lambda: _revalidate(path, ttl, priority))
+
+# --- Асинхронные вызовы (общий keep-alive пул, кэш) ---
+# priority: INTERACTIVE для хендлеров, BACKGROUND для фоновых задач
+async def fetch_player(tag: str, priority: int = INTERACTIVE):
+    return await cached_get(player_path(tag), PLAYER_TTL, priority)
+
+async def fetch_club_members(tag: str, priority: int = INTERACTIVE):
+    data = await cached_get(club_members_path(tag), CLUB_MEMBERS_TTL, priority)
+    return data["items"]
+
+async def fetch_club_members_live(tag: str, priority: int = INTERACTIVE):
+    """
+    Состав клуба в обход свежей записи кэша: условный запрос, 304 почти ничего не стоит.
+    """
+    path = club_members_path(tag)
+    data = await response_cache.single_flight(path, lambda: _revalidate(path, CLUB_MEMBERS_TTL, priority))
+    return data["items"]
+
+# --- Синхронные обёртки со старыми именами ---
 def get_player(tag: str):
-    resp = requests.get(f"https://api.brawlstars.com/v1/players/%23{tag}", headers=HEADERS, timeout=10)
-    resp.raise_for_status()
-    return resp.json()
+    return request_json_sync(player_path(tag))
 
 def get_club_members(tag: str):
-    resp = requests.get(f"https://api.brawlstars.com/v1/clubs/%23{tag}/members", headers=HEADERS, timeout=10)
-    resp.raise_for_status()
-    return resp.json()["items"]
\ No newline at end of file
+    return request_json_sync(club_members_path(tag))["items"]
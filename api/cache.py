@@ -0,0 +1,67 @@
+# api/cache.py
+import re
+import time
+import asyncio
+from collections import OrderedDict
+
+class CacheEntry:
+    __slots__ = ("value", "expires_at", "etag")
+
+    def __init__(self, value, expires_at: float, etag: str = None):
+        self.value = value
+        self.expires_at = expires_at
+        self.etag = etag
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+class ResponseCache:
+    """
+    LRU-кэш ответов API с ограничением по числу записей и объединением одинаковых запросов:
+    параллельные вызовы с одним ключом ждут один и тот же HTTP-запрос.
+    Устаревшие записи не удаляются сразу — их ETag нужен для условного запроса.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, value, ttl: float, etag: str = None):
+        self._entries[key] = CacheEntry(value, time.monotonic() + ttl, etag)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def single_flight(self, key, factory):
+        """
+        Выполняет factory() один раз на ключ, остальные параллельные вызовы ждут результат.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+def cache_ttl(headers, default: float):
+    """
+    TTL по заголовку Cache-Control: max-age, если он есть; None — кэшировать нельзя.
+    """
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return float(match.group(1)) if match else default
@@ -0,0 +1,136 @@
+# api/client.py
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import httpx
+from api.rate_limiter import RateLimiter, INTERACTIVE
+from utils.metrics import observe_api
+
+BRAWL_API_TOKEN = os.getenv("BRAWL_API_TOKEN")
+BASE_URL = "https://api.brawlstars.com/v1"
+HEADERS = {"Authorization": f"Bearer {BRAWL_API_TOKEN}", "Accept": "application/json"}
+
+# Лимиты пула: API живёт на одном хосте, поэтому max_connections — это и лимит на хост
+MAX_CONNECTIONS = int(os.getenv("BRAWL_API_MAX_CONNECTIONS", "10"))
+MAX_KEEPALIVE = int(os.getenv("BRAWL_API_MAX_KEEPALIVE", str(MAX_CONNECTIONS)))
+KEEPALIVE_EXPIRY = float(os.getenv("BRAWL_API_KEEPALIVE_EXPIRY", "60"))
+TIMEOUT = float(os.getenv("BRAWL_API_TIMEOUT", "10"))
+
+# Общий лимит запросов ключа и повторы при 429/5xx
+RATE_LIMIT_RPS = float(os.getenv("BRAWL_API_RPS", "10"))
+RATE_LIMIT_BURST = int(os.getenv("BRAWL_API_BURST", "10"))
+MAX_RETRIES = int(os.getenv("BRAWL_API_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.getenv("BRAWL_API_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("BRAWL_API_BACKOFF_MAX", "30"))
+
+limiter = RateLimiter(RATE_LIMIT_RPS, RATE_LIMIT_BURST)
+
+LIMITS = httpx.Limits(
+    max_connections=MAX_CONNECTIONS,
+    max_keepalive_connections=MAX_KEEPALIVE,
+    keepalive_expiry=KEEPALIVE_EXPIRY
+)
+
+_async_client = None
+_sync_client = None
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Общий асинхронный клиент с keep-alive пулом соединений.
+    Создаётся при первом обращении, TLS-рукопожатие переиспользуется между запросами.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            base_url=BASE_URL, headers=HEADERS, limits=LIMITS, timeout=TIMEOUT
+        )
+    return _async_client
+
+def get_sync_client() -> httpx.Client:
+    """
+    Синхронный клиент с тем же пулом настроек — для старых синхронных обёрток.
+    """
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        _sync_client = httpx.Client(
+            base_url=BASE_URL, headers=HEADERS, limits=LIMITS, timeout=TIMEOUT
+        )
+    return _sync_client
+
+def decode_json(resp: httpx.Response):
+    # Декодируем сразу из байтов тела, без промежуточной строки
+    return json.loads(resp.content)
+
+def retry_after(resp: httpx.Response):
+    try:
+        return float(resp.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int) -> float:
+    # Экспоненциальная задержка с «полным» джиттером
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+async def send(path: str, headers: dict = None, priority: int = INTERACTIVE) -> httpx.Response:
+    """
+    GET через общий лимитер. 429 и 5xx/сетевые ошибки повторяются с backoff;
+    Retry-After останавливает весь лимитер, а не только этот запрос.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.acquire(priority)
+        started = time.perf_counter()
+        try:
+            resp = await get_async_client().get(path, headers=headers)
+        except httpx.TransportError:
+            observe_api(path, "error", time.perf_counter() - started)
+            if attempt == MAX_RETRIES:
+                raise
+            limiter.counters["retries"] += 1
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+        observe_api(path, resp.status_code, time.perf_counter() - started)
+        if resp.status_code == 429 or resp.status_code >= 500:
+            if attempt == MAX_RETRIES:
+                resp.raise_for_status()
+            delay = backoff_delay(attempt)
+            if resp.status_code == 429:
+                wait = retry_after(resp)
+                limiter.block_for(wait if wait is not None else delay)
+                delay = max(delay, wait or 0)
+                logging.warning(f"⚠️ Лимит Brawl API (429), повтор через {delay:.1f} с.")
+            limiter.counters["retries"] += 1
+            await asyncio.sleep(delay)
+            continue
+        return resp
+
+async def request_conditional(path: str, etag: str = None, priority: int = INTERACTIVE):
+    """
+    Условный GET: с If-None-Match, если известен ETag.
+    Возвращает (статус, данные или None при 304, заголовки).
+    """
+    headers = {"If-None-Match": etag} if etag else None
+    resp = await send(path, headers=headers, priority=priority)
+    if resp.status_code == 304:
+        return 304, None, resp.headers
+    resp.raise_for_status()
+    return resp.status_code, decode_json(resp), resp.headers
+
+def request_json_sync(path: str):
+    resp = get_sync_client().get(path)
+    resp.raise_for_status()
+    return decode_json(resp)
+
+async def close():
+    """
+    Закрывает пулы соединений (вызывается при остановке бота).
+    """
+    global _async_client, _sync_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
@@ -0,0 +1,78 @@
+# api/rate_limiter.py
+import time
+import heapq
+import asyncio
+import itertools
+
+# Полосы приоритета: интерактивные вызовы из хендлеров обслуживаются раньше фоновых задач
+INTERACTIVE = 0
+BACKGROUND = 1
+
+class RateLimiter:
+    """
+    Общий на процесс token bucket: rate запросов в секунду, запас до burst.
+    Ожидающие получают токены по приоритету, внутри полосы — по очереди.
+    block_for() останавливает выдачу токенов (например, по Retry-After).
+    """
+
+    def __init__(self, rate: float, burst: int):
+        # rate = 0 делил бы на ноль в _dispatch, отрицательный никогда не пополнял бы токены
+        if rate <= 0:
+            raise ValueError(f"RateLimiter: rate должен быть > 0 (BRAWL_API_RPS), получено {rate}")
+        if burst < 1:
+            raise ValueError(f"RateLimiter: burst должен быть >= 1 (BRAWL_API_BURST), получено {burst}")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._timer = None
+        self.counters = {"granted": 0, "queued": 0, "throttled": 0, "retries": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+    def _dispatch(self):
+        self._timer = None
+        now = self._refill()
+        while self._waiters and now >= self._blocked_until and self._tokens >= 1:
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():  # ожидающий отменён
+                continue
+            self._tokens -= 1
+            self.counters["granted"] += 1
+            fut.set_result(None)
+        if self._waiters:
+            delay = max(self._blocked_until - now, (1 - self._tokens) / self.rate, 0.001)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    async def acquire(self, priority: int = BACKGROUND):
+        now = self._refill()
+        if not self._waiters and now >= self._blocked_until and self._tokens >= 1:
+            self._tokens -= 1
+            self.counters["granted"] += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        self.counters["queued"] += 1
+        if self._timer is None:
+            self._dispatch()
+        await fut
+
+    def block_for(self, seconds: float):
+        """
+        Не выдавать токены seconds секунд (сервер ответил 429).
+        """
+        self.counters["throttled"] += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._waiters:
+            self._dispatch()
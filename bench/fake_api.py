@@ -0,0 +1,90 @@
+# bench/fake_api.py
+import json
+import random
+import asyncio
+import tornado.web
+from urllib.parse import unquote
+
+class FakeBrawlApi:
+    """
+    Локальный фейковый Brawl Stars API: клуб из roster_size игроков,
+    искусственная задержка ответа и случайные 429.
+    """
+
+    def __init__(self, club_tag: str, roster_size: int, latency_ms=(20, 60),
+                 throttle_rate: float = 0.0, retry_after: int = 1):
+        self.club_tag = club_tag
+        self.latency_ms = latency_ms
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self.throttled = 0
+        self.players = {
+            player_tag(i): {"tag": f"#{player_tag(i)}", "name": f"Bear{i}", "trophies": random.randint(500, 5000)}
+            for i in range(roster_size)
+        }
+        self._server = None
+        self.port = None
+
+    async def respond(self, handler: tornado.web.RequestHandler, payload):
+        self.requests += 1
+        await asyncio.sleep(random.uniform(*self.latency_ms) / 1000)
+        if random.random() < self.throttle_rate:
+            self.throttled += 1
+            handler.set_status(429)
+            handler.set_header("Retry-After", str(self.retry_after))
+            handler.write({"reason": "requestThrottled"})
+            return
+        if payload is None:
+            handler.set_status(404)
+            handler.write({"reason": "notFound"})
+            return
+        handler.set_header("Content-Type", "application/json")
+        handler.write(json.dumps(payload))
+
+    def player(self, tag: str):
+        data = self.players.get(tag)
+        if data is None:
+            return None
+        return {**data, "club": {"tag": f"#{self.club_tag}", "name": "МЕДВЕЖАТА"}}
+
+    def members(self, tag: str):
+        if tag != self.club_tag:
+            return None
+        return {"items": list(self.players.values())}
+
+    def make_app(self) -> tornado.web.Application:
+        api = self
+
+        class PlayerHandler(tornado.web.RequestHandler):
+            async def get(self, tag):
+                await api.respond(self, api.player(clean(tag)))
+
+        class MembersHandler(tornado.web.RequestHandler):
+            async def get(self, tag):
+                await api.respond(self, api.members(clean(tag)))
+
+        return tornado.web.Application([
+            (r"/v1/players/([^/]+)", PlayerHandler),
+            (r"/v1/clubs/([^/]+)/members", MembersHandler),
+        ])
+
+    def start(self, port: int = 0) -> str:
+        """
+        Запускает сервер на localhost (port=0 — любой свободный) и возвращает base URL.
+        """
+        self._server = self.make_app().listen(port, address="127.0.0.1")
+        self.port = next(iter(self._server._sockets.values())).getsockname()[1]
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.stop()
+            self._server = None
+
+def player_tag(i: int) -> str:
+    return f"B{i:07d}"
+
+def clean(tag: str) -> str:
+    tag = unquote(tag)
+    return tag[1:] if tag.startswith("#") else tag
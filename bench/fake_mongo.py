@@ -0,0 +1,57 @@
+# bench/fake_mongo.py
+from collections import Counter
+from mongomock_motor import AsyncMongoMockClient
+
+# Операции, которые считаются за один запрос к БД
+COUNTED_METHODS = {
+    "find", "find_one", "aggregate", "count_documents", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "bulk_write",
+    "find_one_and_update", "find_one_and_delete", "find_one_and_replace",
+    "create_index",
+}
+
+class CountingCollection:
+    def __init__(self, collection, counter: Counter):
+        self._collection = collection
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in COUNTED_METHODS:
+            return attr
+
+        def counted(*args, **kwargs):
+            self._counter[self._collection.name] += 1
+            return attr(*args, **kwargs)
+        return counted
+
+class CountingDatabase:
+    def __init__(self, database, counter: Counter):
+        self._database = database
+        self._counter = counter
+
+    def __getitem__(self, name):
+        return CountingCollection(self._database[name], self._counter)
+
+    def __getattr__(self, name):
+        return self[name]
+
+class CountingClient:
+    """
+    In-memory Mongo (mongomock-motor), считающий запросы по коллекциям.
+    Подставляется вместо клиента в db.async_client.
+    """
+
+    def __init__(self):
+        self.counter = Counter()
+        self._client = AsyncMongoMockClient(tz_aware=True)
+
+    def __getitem__(self, name):
+        return CountingDatabase(self._client[name], self.counter)
+
+    def total(self) -> int:
+        return sum(self.counter.values())
+
+    def close(self):
+        pass
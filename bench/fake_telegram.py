@@ -0,0 +1,104 @@
+# bench/fake_telegram.py
+import json
+import time
+import itertools
+from http import HTTPStatus
+from telegram import Update
+from telegram.request import BaseRequest
+
+BOT_USER = {"id": 777000, "is_bot": True, "first_name": "BenchBot", "username": "bench_bot"}
+
+class FakeTelegramRequest(BaseRequest):
+    """
+    Bot API без сети: отвечает на вызовы бота правдоподобными объектами и считает их.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def message(self, params: dict) -> dict:
+        msg = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+            "from": BOT_USER,
+        }
+        if "text" in params:
+            msg["text"] = params["text"]
+        if "caption" in params:
+            msg["caption"] = params["caption"]
+        return msg
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit("/", 1)[-1]
+        self.calls[api_method] = self.calls.get(api_method, 0) + 1
+        params = request_data.parameters if request_data else {}
+
+        if api_method == "getMe":
+            result = BOT_USER
+        elif api_method in ("sendMessage", "editMessageText", "sendDocument"):
+            result = self.message(params)
+        elif api_method == "sendPhoto":
+            result = self.message(params)
+            file_id = f"photo-{next(self._file_ids)}"
+            result["photo"] = [{"file_id": file_id, "file_unique_id": file_id, "width": 1, "height": 1}]
+        else:
+            result = True
+        return HTTPStatus.OK, json.dumps({"ok": True, "result": result}).encode()
+
+_update_ids = itertools.count(1)
+
+def tg_user(tg_id: int, username: str = None) -> dict:
+    user = {"id": tg_id, "is_bot": False, "first_name": f"User{tg_id}"}
+    if username:
+        user["username"] = username
+    return user
+
+def command_update(bot, tg_id: int, text: str, username: str = None) -> Update:
+    """
+    Синтетический апдейт с командой (например, "/me" или "/you #TAG").
+    """
+    command = text.split()[0]
+    data = {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_update_ids),
+            "date": int(time.time()),
+            "chat": {"id": tg_id, "type": "private"},
+            "from": tg_user(tg_id, username),
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        },
+    }
+    return Update.de_json(data, bot)
+
+def callback_update(bot, tg_id: int, data: str) -> Update:
+    """
+    Синтетическое нажатие inline-кнопки с callback_data=data.
+    """
+    payload = {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": tg_user(tg_id),
+            "chat_instance": str(tg_id),
+            "data": data,
+            "message": {
+                "message_id": next(_update_ids),
+                "date": int(time.time()),
+                "chat": {"id": tg_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "menu",
+            },
+        },
+    }
+    return Update.de_json(payload, bot)
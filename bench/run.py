@@ -0,0 +1,246 @@
+# bench/run.py
+"""
+Офлайн-бенчмарк бота: фейковый Brawl Stars API, in-memory Mongo и синтетические апдейты.
+
+    python -m bench.run --sizes 30,300,3000 --chats 20 --out bench_output.json
+
+Результат — JSON: p50/p95/p99 задержки по командам, запросы к БД на команду,
+время циклов check_club_changes и update_players_cache.
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timezone
+
+BENCH_ADMIN_ID = 1
+BENCH_CLUB_TAG = "BENCH0CLUB"
+
+# Окружение задаётся до импорта модулей бота: они читают его при импорте
+os.environ["ADMIN_USER_ID"] = str(BENCH_ADMIN_ID)
+os.environ["CLUB_TAG"] = BENCH_CLUB_TAG
+os.environ.setdefault("BOT_TOKEN", "123456:BENCH")
+os.environ.setdefault("BRAWL_API_TOKEN", "bench")
+os.environ.setdefault("BRAWL_API_RPS", "1000")
+os.environ.setdefault("BRAWL_API_BURST", "100")
+os.environ.setdefault("BRAWL_API_BACKOFF_BASE", "0.05")
+os.environ.setdefault("METRICS_PORT", "0")
+# Бенчмарк начинает с холодного старта
+os.environ["WARM_START_PATH"] = os.path.join(tempfile.gettempdir(), "bench_no_warm_start.json")
+
+import main
+from api import client as brawl_client, brawl_api
+from db import async_client
+from jobs import club_monitor, player_updater, refresh_scheduler
+from utils import season, user_cache, roster, assets, clubs, leaderboard_snapshot
+from bench.fake_api import FakeBrawlApi, player_tag
+from bench.fake_mongo import CountingClient
+from bench.fake_telegram import FakeTelegramRequest, command_update, callback_update
+
+def percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+def reset_state():
+    """
+    Сбрасывает кэши процесса между прогонами разных размеров клуба.
+    """
+    brawl_api.response_cache.clear()
+    user_cache._cache.clear()
+    user_cache._tag_index.clear()
+    season.invalidate_season_config()
+    roster._tags = None
+    clubs.invalidate()
+    leaderboard_snapshot._snapshots.clear()
+    leaderboard_snapshot._texts.clear()
+    leaderboard_snapshot._latest_version = None
+    assets._file_ids.clear()
+    refresh_scheduler._players.clear()
+
+async def seed_users(size: int):
+    now = datetime.now(timezone.utc)
+    approved = [
+        {
+            "tg_id": 10_000 + i, "tg_username": f"user{i}", "real_name": f"Медведь {i}",
+            "bs_tag": player_tag(i), "status": "approved", "join_bot_date": now, "join_club_date": now,
+        }
+        for i in range(size)
+    ]
+    pending = [
+        {
+            "tg_id": 900_000 + i, "tg_username": f"pending{i}", "real_name": f"Новичок {i}",
+            "bs_tag": f"Q{i:07d}", "status": "pending", "join_bot_date": now, "join_club_date": now,
+        }
+        for i in range(max(1, size // 10))
+    ]
+    await async_client.get_db().users.insert_many(approved + pending)
+    return approved, pending
+
+async def timed_job(job, mongo: CountingClient):
+    queries = mongo.total()
+    started = time.perf_counter()
+    await job(None)
+    return {"cycle_s": round(time.perf_counter() - started, 4), "queries": mongo.total() - queries}
+
+def command_scenarios(approved, pending):
+    """
+    Имя -> функция (bot) -> (Update, от чьего имени).
+    """
+    def user():
+        return random.choice(approved)
+
+    def cmd(text_fn, admin=False):
+        def make(bot):
+            u = user()
+            tg_id = BENCH_ADMIN_ID if admin else u["tg_id"]
+            return command_update(bot, tg_id, text_fn(u), u["tg_username"])
+        return make
+
+    def cb(data_fn, admin=False):
+        def make(bot):
+            u = user()
+            return callback_update(bot, BENCH_ADMIN_ID if admin else u["tg_id"], data_fn(u))
+        return make
+
+    return {
+        "start": cmd(lambda u: "/start"),
+        "me": cmd(lambda u: "/me"),
+        "you": cmd(lambda u: f"/you #{user()['bs_tag']}"),
+        "top": cmd(lambda u: "/top"),
+        "top_progress": cb(lambda u: "top_progress"),
+        "club": cmd(lambda u: "/club"),
+        "admin_ack": cmd(lambda u: "/ACK", admin=True),
+        "admin_ack_user": cb(lambda u: f"ack_user_{random.choice(pending)['tg_id']}", admin=True),
+        "admin_whois": cb(lambda u: f"whois_{u['bs_tag']}", admin=True),
+        "admin_history": cmd(lambda u: "/history", admin=True),
+        "admin_we": cmd(lambda u: "/we", admin=True),
+        "admin_we_user": cb(lambda u: f"we_user_{u['tg_id']}", admin=True),
+    }
+
+async def run_command(app, make_update, chats: int, per_chat: int, mongo: CountingClient, request, errors):
+    latencies = []
+    queries = mongo.total()
+    tg_calls = sum(request.calls.values())
+    errors_before = len(errors)
+
+    async def chat():
+        for _ in range(per_chat):
+            update = make_update(app.bot)
+            started = time.perf_counter()
+            await app.process_update(update)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(chat() for _ in range(chats)))
+    wall = time.perf_counter() - started
+    count = len(latencies)
+    return {
+        "count": count,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / count, 3) if count else 0.0,
+        "throughput_per_s": round(count / wall, 1) if wall else 0.0,
+        "queries_per_command": round((mongo.total() - queries) / count, 2) if count else 0.0,
+        "telegram_calls_per_command": round((sum(request.calls.values()) - tg_calls) / count, 2) if count else 0.0,
+        "errors": len(errors) - errors_before,
+    }
+
+async def run_size(size: int, args) -> dict:
+    fake_api = FakeBrawlApi(
+        BENCH_CLUB_TAG, size, latency_ms=(args.latency_min_ms, args.latency_max_ms),
+        throttle_rate=args.throttle_rate, retry_after=args.retry_after
+    )
+    brawl_client.BASE_URL = fake_api.start()
+    await brawl_client.close()
+    mongo = CountingClient()
+    async_client._client = mongo
+    reset_state()
+
+    request = FakeTelegramRequest()
+    app = main.build_app(request)
+    errors = []
+
+    async def collect_error(update, context):
+        errors.append(repr(context.error))
+    app.add_error_handler(collect_error)
+
+    await app.initialize()
+    await main.on_startup(app)
+    approved, pending = await seed_users(size)
+
+    result = {"roster_size": size, "jobs": {}, "commands": {}}
+    result["jobs"]["check_club_changes_initial"] = await timed_job(club_monitor.check_club_changes, mongo)
+    brawl_api.response_cache.clear()
+    result["jobs"]["check_club_changes_steady"] = await timed_job(club_monitor.check_club_changes, mongo)
+    result["jobs"]["update_players_cache"] = await timed_job(player_updater.update_players_cache, mongo)
+    result["jobs"]["update_players_cache"]["players"] = size
+    result["api"] = {
+        "requests": fake_api.requests, "throttled_429": fake_api.throttled,
+        "limiter": dict(brawl_client.limiter.counters)
+    }
+
+    for name, make_update in command_scenarios(approved, pending).items():
+        result["commands"][name] = await run_command(
+            app, make_update, args.chats, args.requests_per_chat, mongo, request, errors
+        )
+
+    result["queries_by_collection"] = dict(mongo.counter)
+    if errors:
+        result["error_samples"] = sorted(set(errors))[:5]
+
+    await app.shutdown()
+    fake_api.stop()
+    return result
+
+async def run(args) -> dict:
+    results = []
+    for size in args.sizes:
+        logging.warning(f"⏱️ Бенчмарк: клуб из {size} игроков...")
+        results.append(await run_size(size, args))
+    await brawl_client.close()
+    return {
+        "config": {
+            "sizes": args.sizes, "chats": args.chats, "requests_per_chat": args.requests_per_chat,
+            "latency_ms": [args.latency_min_ms, args.latency_max_ms], "throttle_rate": args.throttle_rate,
+        },
+        "results": results,
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк бота МЕДВЕЖАТА")
+    parser.add_argument("--sizes", default="30,300,3000", type=lambda s: [int(x) for x in s.split(",")])
+    parser.add_argument("--chats", default=20, type=int, help="одновременных чатов")
+    parser.add_argument("--requests-per-chat", default=5, type=int)
+    parser.add_argument("--latency-min-ms", default=20.0, type=float)
+    parser.add_argument("--latency-max-ms", default=60.0, type=float)
+    parser.add_argument("--throttle-rate", default=0.01, type=float, help="доля ответов 429")
+    parser.add_argument("--retry-after", default=1, type=int)
+    parser.add_argument("--seed", default=1, type=int)
+    parser.add_argument("--out", help="файл для JSON (по умолчанию stdout)")
+    return parser.parse_args(argv)
+
+def cli(argv=None):
+    args = parse_args(argv)
+    random.seed(args.seed)
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("tornado.access").setLevel(logging.ERROR)
+    report = asyncio.run(run(args))
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output + "\n")
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,20 @@
+# db/assets_repo.py
+from datetime import datetime, timezone
+from db.async_client import get_db
+
+def collection():
+    return get_db().asset_files
+
+async def get_file_id(content_hash: str):
+    doc = await collection().find_one({"_id": content_hash}, {"file_id": 1})
+    return doc["file_id"] if doc else None
+
+async def save_file_id(content_hash: str, name: str, file_id: str):
+    await collection().update_one(
+        {"_id": content_hash},
+        {"$set": {"file_id": file_id, "name": name, "uploaded_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+async def forget(content_hash: str):
+    await collection().delete_one({"_id": content_hash})
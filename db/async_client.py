@@ -0,0 +1,36 @@
+# db/async_client.py
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+from utils.metrics import MongoMetricsListener
+
+MONGO_URI = os.getenv("MONGO_URI")
+DB_NAME = "brawl_bears_db"
+
+# Размер пула и таймаут одной операции (мс) — медленный запрос не держит остальные
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "2"))
+MONGO_OP_TIMEOUT_MS = int(os.getenv("MONGO_OP_TIMEOUT_MS", "5000"))
+
+_client = None
+
+def get_client() -> AsyncIOMotorClient:
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(
+            MONGO_URI,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            timeoutMS=MONGO_OP_TIMEOUT_MS,
+            tz_aware=True,
+            event_listeners=[MongoMetricsListener()]
+        )
+    return _client
+
+def get_db():
+    return get_client()[DB_NAME]
+
+def close():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
@@ -0,0 +1,22 @@
+# db/cache_epochs_repo.py
+from pymongo import ReturnDocument
+from db.async_client import get_db
+
+def collection():
+    return get_db().cache_epochs
+
+async def get(name: str) -> int:
+    doc = await collection().find_one({"_id": name})
+    return doc["epoch"] if doc else 0
+
+async def bump(name: str) -> int:
+    """
+    Увеличивает эпоху кэша: остальные реплики по ней понимают, что их копия устарела.
+    """
+    doc = await collection().find_one_and_update(
+        {"_id": name},
+        {"$inc": {"epoch": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["epoch"]
@@ -0,0 +1,101 @@
+# db/club_repo.py
+from datetime import datetime, timezone
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from db.async_client import get_db
+from db.pagination import keyset_page, search_filter
+
+HISTORY_SORT = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+
+def members():
+    return get_db().club_members
+
+def history():
+    return get_db().club_history
+
+async def list_members(club_tags, projection=None):
+    return await members().find({"club_tag": {"$in": list(club_tags)}}, projection).to_list(None)
+
+async def write_members(ops):
+    # ordered=True: upsert-ы выполняются раньше удалений
+    return await members().bulk_write(ops, ordered=True)
+
+async def insert_history(events):
+    await history().insert_many(events, ordered=False)
+
+async def history_page(cursor=None, backward: bool = False, search: str = None, limit: int = 20):
+    query = search_filter(search, "name") if search else {}
+    return await keyset_page(history(), query, HISTORY_SORT, cursor, backward, limit)
+
+def monthly():
+    return get_db().club_history_monthly
+
+def iter_history(query: dict, batch_size: int):
+    """
+    Курсор по событиям в хронологическом порядке, читается пачками по batch_size.
+    """
+    return history().find(query, {"_id": 0}).sort([("timestamp", ASCENDING), ("_id", ASCENDING)]).batch_size(batch_size)
+
+def iter_monthly(batch_size: int):
+    return monthly().find({}, {"_id": 0}).sort([("month", ASCENDING), ("club_tag", ASCENDING)]).batch_size(batch_size)
+
+async def monthly_counts_before(cutoff):
+    """
+    Число вступлений и выходов по клубам и месяцам среди событий старше cutoff.
+    """
+    pipeline = [
+        {"$match": {"timestamp": {"$lt": cutoff}}},
+        {"$group": {
+            "_id": {"club_tag": "$club_tag", "year": {"$year": "$timestamp"}, "month": {"$month": "$timestamp"}},
+            "joined": {"$sum": {"$cond": [{"$eq": ["$event", "joined"]}, 1, 0]}},
+            "left": {"$sum": {"$cond": [{"$eq": ["$event", "left"]}, 1, 0]}}
+        }}
+    ]
+    return await history().aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+async def save_monthly(summaries):
+    """
+    summaries — [{club_tag, month, joined, left}]; повторный запуск перезаписывает те же документы.
+    """
+    ops = [
+        UpdateOne(
+            {"_id": f"{s['club_tag']}:{s['month']:%Y-%m}"},
+            {"$set": s},
+            upsert=True
+        )
+        for s in summaries
+    ]
+    if ops:
+        await monthly().bulk_write(ops, ordered=False)
+
+async def delete_history_before(cutoff) -> int:
+    result = await history().delete_many({"timestamp": {"$lt": cutoff}})
+    return result.deleted_count
+
+def sync_state():
+    return get_db().club_sync
+
+async def assign_unscoped(club_tag: str):
+    """
+    Записи без club_tag (до поддержки нескольких клубов) относятся к club_tag.
+    Разовая миграция: после неё в club_sync остаётся отметка, и повторные запуски ничего не сканируют.
+    """
+    if await sync_state().find_one({"_id": "migration:club_tag"}, {"_id": 1}):
+        return
+    await members().update_many({"club_tag": {"$exists": False}}, {"$set": {"club_tag": club_tag}})
+    await history().update_many({"club_tag": {"$exists": False}}, {"$set": {"club_tag": club_tag}})
+    await sync_state().update_one(
+        {"_id": "migration:club_tag"}, {"$set": {"done_at": datetime.now(timezone.utc)}}, upsert=True
+    )
+
+async def mark_synced(club_tag: str, when):
+    await sync_state().update_one({"_id": f"roster:{club_tag}"}, {"$set": {"synced_at": when}}, upsert=True)
+
+async def get_synced_at(club_tags):
+    """
+    Время самой давней синхронизации среди club_tags; None, если какой-то клуб ещё не синхронизирован.
+    """
+    ids = [f"roster:{tag}" for tag in club_tags]
+    docs = await sync_state().find({"_id": {"$in": ids}}).to_list(None)
+    if not ids or len(docs) < len(ids):
+        return None
+    return min(doc["synced_at"] for doc in docs)
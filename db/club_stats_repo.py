@@ -0,0 +1,11 @@
+# db/club_stats_repo.py
+from db.async_client import get_db
+
+def collection():
+    return get_db().club_stats
+
+async def get():
+    return await collection().find_one({"_id": "current"})
+
+async def save(stats: dict):
+    await collection().replace_one({"_id": "current"}, {"_id": "current", **stats}, upsert=True)
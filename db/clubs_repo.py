@@ -0,0 +1,20 @@
+# db/clubs_repo.py
+from pymongo import UpdateOne
+from db.async_client import get_db
+
+def collection():
+    return get_db().clubs
+
+async def list_active():
+    return await collection().find({"active": True}).sort("_id", 1).to_list(None)
+
+async def seed(tags, main_tag: str):
+    """
+    Регистрирует клубы из окружения. Уже выключенные (active: false) клубы не включаются заново.
+    """
+    ops = [
+        UpdateOne({"_id": tag}, {"$setOnInsert": {"active": True}, "$set": {"main": tag == main_tag}}, upsert=True)
+        for tag in tags
+    ]
+    if ops:
+        await collection().bulk_write(ops, ordered=False)
@@ -0,0 +1,129 @@
+# db/indexes.py
+"""
+Создание индексов при старте и проверка планов горячих запросов.
+
+Проверка планов: python -m db.indexes
+"""
+import sys
+import logging
+from datetime import datetime, timezone
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError, OperationFailure
+from db.leaderboard_repo import ORDERS
+
+# коллекция -> [(ключи, опции)]
+INDEXES = {
+    "users": [
+        ([("tg_id", ASCENDING)], {"unique": True}),
+        ([("bs_tag", ASCENDING)], {}),
+        ([("status", ASCENDING), ("bs_tag", ASCENDING)], {}),
+        ([("tg_username", ASCENDING)], {}),
+        ([("status", ASCENDING), ("_id", ASCENDING)], {}),
+    ],
+    "players_cache": [
+        ([("bs_tag", ASCENDING)], {"unique": True}),
+    ],
+    "club_members": [
+        ([("club_tag", ASCENDING), ("bs_tag", ASCENDING)], {"unique": True}),
+        ([("bs_tag", ASCENDING)], {}),
+    ],
+    "club_history": [
+        ([("timestamp", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("bs_tag", ASCENDING), ("timestamp", ASCENDING)], {}),
+    ],
+    "trophy_history": [
+        ([("bs_tag", ASCENDING), ("ts", DESCENDING)], {}),
+        ([("res", ASCENDING), ("ts", ASCENDING)], {}),
+    ],
+    "replicas": [
+        ([("seen_at", ASCENDING)], {"expireAfterSeconds": 3600}),
+    ],
+    "outbox": [
+        ([("status", ASCENDING), ("not_before", ASCENDING), ("_id", ASCENDING)], {}),
+        ([("status", ASCENDING), ("chat_id", ASCENDING), ("not_before", ASCENDING), ("_id", ASCENDING)], {}),
+        ([("finished_at", ASCENDING)], {"expireAfterSeconds": 7 * 86400}),
+    ],
+    "leaderboard": [([("bs_tag", ASCENDING)], {"unique": True})] + [(keys, {}) for keys in ORDERS.values()],
+}
+
+# Индекс с тем же именем, но другими опциями или ключами
+INDEX_CONFLICT_CODES = (85, 86)
+
+# Горячие формы запросов: (коллекция, фильтр, сортировка, limit)
+HOT_QUERIES = [
+    ("users", {"tg_id": 0}, None, 1),
+    ("users", {"tg_username": "x", "status": "approved"}, None, 1),
+    ("users", {"bs_tag": "X", "status": "approved"}, None, 1),
+    ("users", {"status": "approved"}, None, 0),
+    ("users", {"bs_tag": {"$in": ["X", "Y"]}}, None, 0),
+    ("players_cache", {"bs_tag": "X"}, None, 1),
+    ("club_members", {"club_tag": {"$in": ["X", "Y"]}}, None, 0),
+    ("users", {"status": "pending"}, [("_id", ASCENDING)], 11),
+    ("outbox", {"status": "pending", "not_before": {"$lte": datetime(2000, 1, 1, tzinfo=timezone.utc)}},
+     [("not_before", ASCENDING), ("_id", ASCENDING)], 0),
+    ("outbox", {"status": "pending", "chat_id": {"$in": [1, 2]}, "not_before": {"$lte": datetime(2000, 1, 1, tzinfo=timezone.utc)}},
+     [("not_before", ASCENDING), ("_id", ASCENDING)], 0),
+    ("club_history", {}, [("timestamp", DESCENDING), ("_id", DESCENDING)], 21),
+    ("club_history", {"bs_tag": "X", "timestamp": {"$gte": datetime(2000, 1, 1, tzinfo=timezone.utc)}},
+     [("timestamp", ASCENDING), ("_id", ASCENDING)], 0),
+    ("trophy_history", {"bs_tag": "X", "ts": {"$lte": datetime(2000, 1, 1, tzinfo=timezone.utc)}}, [("ts", DESCENDING)], 1),
+] + [("leaderboard", {}, keys, 10) for keys in ORDERS.values()]
+
+async def ensure_indexes(db):
+    """
+    Идемпотентно создаёт индексы. Ошибка одного индекса (например, дубли при unique)
+    логируется и не мешает запуску бота.
+    """
+    for coll_name, specs in INDEXES.items():
+        for keys, options in specs:
+            try:
+                try:
+                    await db[coll_name].create_index(keys, **options)
+                except OperationFailure as e:
+                    if e.code not in INDEX_CONFLICT_CODES:
+                        raise
+                    # Спецификация индекса изменилась (например, bs_tag перестал быть unique) — пересоздаём
+                    name = "_".join(f"{field}_{direction}" for field, direction in keys)
+                    logging.warning(f"🔁 Пересоздаём индекс {coll_name}.{name}")
+                    await db[coll_name].drop_index(name)
+                    await db[coll_name].create_index(keys, **options)
+            except PyMongoError as e:
+                logging.error(f"❌ Не удалось создать индекс {coll_name} {keys}: {e}")
+    logging.info("✅ Индексы проверены.")
+
+def plan_stages(plan: dict):
+    """
+    Рекурсивно собирает названия стадий плана запроса.
+    """
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return [s for s in stages if s]
+
+def explain_hot_queries(db):
+    """
+    Выполняет explain() для каждой горячей формы запроса. Возвращает список запросов с COLLSCAN.
+    """
+    scans = []
+    for coll_name, query, sort, limit in HOT_QUERIES:
+        cursor = db[coll_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        stages = plan_stages(plan)
+        flag = "❌ COLLSCAN" if "COLLSCAN" in stages else "✅"
+        print(f"{flag} {coll_name} {query} sort={sort}: {' <- '.join(stages)}")
+        if "COLLSCAN" in stages:
+            scans.append((coll_name, query, sort))
+    return scans
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    from db.mongo_client import get_db
+    sys.exit(1 if explain_hot_queries(get_db()) else 0)
@@ -0,0 +1,49 @@
+# db/leaderboard_repo.py
+from pymongo import UpdateOne, ASCENDING, DESCENDING
+from db.async_client import get_db
+
+# Порядки сортировки рейтинга: поле -> ключ сортировки (под него есть индекс)
+ORDERS = {
+    "trophies": [("trophies", DESCENDING), ("bs_tag", ASCENDING)],
+    "percent": [("percent", DESCENDING), ("progress", DESCENDING), ("bs_tag", ASCENDING)],
+}
+
+def collection():
+    return get_db().leaderboard
+
+async def upsert_rows(rows):
+    if not rows:
+        return
+    ops = [UpdateOne({"bs_tag": row["bs_tag"]}, {"$set": row}, upsert=True) for row in rows]
+    await collection().bulk_write(ops, ordered=False)
+
+async def delete_by_tags(bs_tags):
+    await collection().delete_many({"bs_tag": {"$in": list(bs_tags)}})
+
+async def find_by_tag(bs_tag: str):
+    return await collection().find_one({"bs_tag": bs_tag})
+
+async def find_by_tags(bs_tags, projection=None):
+    return await collection().find({"bs_tag": {"$in": list(bs_tags)}}, projection).to_list(None)
+
+async def top(order: str = "trophies", limit: int = 10, projection=None):
+    return await collection().find({}, projection or {"_id": 0}).sort(ORDERS[order]).limit(limit).to_list(None)
+
+async def summary():
+    """
+    Сводка по клубу одним aggregation-запросом: участники, трофеи, прирост за сезон, выполнившие норму.
+    """
+    pipeline = [
+        {"$group": {
+            "_id": None,
+            "members": {"$sum": 1},
+            "total_trophies": {"$sum": "$trophies"},
+            "season_gain": {"$sum": "$progress"},
+            "done": {"$sum": {"$cond": [{"$gte": ["$progress", "$norm"]}, 1, 0]}}
+        }}
+    ]
+    result = await collection().aggregate(pipeline).to_list(1)
+    if not result:
+        return {"members": 0, "total_trophies": 0, "season_gain": 0, "done": 0}
+    result[0].pop("_id")
+    return result[0]
@@ -0,0 +1,22 @@
+# db/leaderboard_snapshots_repo.py
+from pymongo.errors import DuplicateKeyError
+from db.async_client import get_db
+
+def collection():
+    return get_db().leaderboard_snapshots
+
+async def insert(snapshot: dict):
+    try:
+        await collection().insert_one(snapshot)
+    except DuplicateKeyError:
+        # Та же версия уже опубликована другой репликой
+        pass
+
+async def get(version: int):
+    return await collection().find_one({"_id": version})
+
+async def latest():
+    return await collection().find_one({}, sort=[("_id", -1)])
+
+async def delete_older_than(version: int):
+    await collection().delete_many({"_id": {"$lt": version}})
@@ -0,0 +1,40 @@
+# db/leases_repo.py
+from datetime import timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from db.async_client import get_db
+
+def collection():
+    return get_db().leases
+
+async def acquire(name: str, holder: str, ttl: float, now):
+    """
+    Продлевает аренду или захватывает истёкшую. Возвращает документ аренды или None, если она занята.
+    Фенсинг-токен растёт только при смене владельца.
+    """
+    expires_at = now + timedelta(seconds=ttl)
+    lease = await collection().find_one_and_update(
+        {"_id": name, "holder": holder, "expires_at": {"$gt": now}},
+        {"$set": {"expires_at": expires_at}},
+        return_document=ReturnDocument.AFTER
+    )
+    if lease is not None:
+        return lease
+    try:
+        # upsert при занятой аренде упирается в _id и падает с DuplicateKeyError
+        return await collection().find_one_and_update(
+            {"_id": name, "expires_at": {"$lte": now}},
+            {"$set": {"holder": holder, "expires_at": expires_at, "acquired_at": now}, "$inc": {"token": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        return None
+
+async def is_held(name: str, holder: str, token: int, now) -> bool:
+    return await collection().find_one(
+        {"_id": name, "holder": holder, "token": token, "expires_at": {"$gt": now}}, {"_id": 1}
+    ) is not None
+
+async def release(name: str, holder: str, now):
+    await collection().update_one({"_id": name, "holder": holder}, {"$set": {"expires_at": now}})
@@ -1,8 +1,14 @@
 # db/mongo_client.py
 import os
 from pymongo import MongoClient
-from dotenv import load_dotenv
 
-load_dotenv()
-client = MongoClient(os.getenv("MONGO_URI"))
-db = client["brawl_bears_db"]
\ No newline at end of file
+_client = None
+
+def get_db():
+    """
+    Синхронный клиент для скриптов (python -m db.indexes); создаётся при первом обращении.
+    """
+    global _client
+    if _client is None:
+        _client = MongoClient(os.getenv("MONGO_URI"))
+    return _client["brawl_bears_db"]
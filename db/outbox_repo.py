@@ -0,0 +1,54 @@
+# db/outbox_repo.py
+from datetime import datetime, timezone
+from db.async_client import get_db
+
+def collection():
+    return get_db().outbox
+
+async def enqueue(messages):
+    if messages:
+        await collection().insert_many(messages, ordered=True)
+
+async def due_chats(now, exclude, limit: int):
+    """
+    До limit чатов с готовыми к отправке сообщениями, по самому раннему сообщению чата.
+    Один чат с длинной очередью занимает одну позицию, а не всю выборку.
+    """
+    pipeline = [
+        {"$match": {"status": "pending", "not_before": {"$lte": now}, "chat_id": {"$nin": list(exclude)}}},
+        {"$sort": {"not_before": 1, "_id": 1}},
+        {"$group": {"_id": "$chat_id", "not_before": {"$first": "$not_before"}, "first_id": {"$first": "$_id"}}},
+        {"$sort": {"not_before": 1, "first_id": 1}},
+        {"$limit": limit},
+    ]
+    docs = await collection().aggregate(pipeline).to_list(None)
+    return [d["_id"] for d in docs]
+
+async def due_for_chats(now, chat_ids, per_chat: int):
+    """
+    Первые per_chat готовых сообщений каждого из chat_ids в порядке постановки: {chat_id: [сообщения]}.
+    """
+    pipeline = [
+        {"$match": {"status": "pending", "not_before": {"$lte": now}, "chat_id": {"$in": list(chat_ids)}}},
+        {"$sort": {"not_before": 1, "_id": 1}},
+        {"$group": {"_id": "$chat_id", "messages": {"$push": "$$ROOT"}}},
+        {"$project": {"messages": {"$slice": ["$messages", per_chat]}}},
+    ]
+    docs = await collection().aggregate(pipeline).to_list(None)
+    return {d["_id"]: d["messages"] for d in docs}
+
+async def mark_sent(ids):
+    now = datetime.now(timezone.utc)
+    await collection().update_many({"_id": {"$in": ids}}, {"$set": {"status": "sent", "finished_at": now}})
+
+async def reschedule(ids, not_before, error: str, attempt: bool = True):
+    update = {"$set": {"not_before": not_before, "last_error": error}}
+    if attempt:
+        update["$inc"] = {"attempts": 1}
+    await collection().update_many({"_id": {"$in": ids}}, update)
+
+async def mark_failed(ids, error: str):
+    now = datetime.now(timezone.utc)
+    await collection().update_many(
+        {"_id": {"$in": ids}}, {"$set": {"status": "failed", "last_error": error, "finished_at": now}}
+    )
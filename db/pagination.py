@@ -0,0 +1,47 @@
+# db/pagination.py
+import re
+from pymongo import ASCENDING
+
+def search_filter(text: str, name_field: str) -> dict:
+    """
+    Фильтр по началу имени (без учёта регистра) или тега.
+    """
+    text = text.lstrip("#")
+    return {"$or": [
+        {name_field: {"$regex": "^" + re.escape(text), "$options": "i"}},
+        {"bs_tag": {"$regex": "^" + re.escape(text.upper())}}
+    ]}
+
+def keyset_filter(sort, cursor, backward: bool) -> dict:
+    """
+    Условие «строго после cursor» в порядке sort (или «строго до» при backward).
+    Последнее поле sort должно быть уникальным (обычно _id).
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        forward_op = "$gt" if direction == ASCENDING else "$lt"
+        op = forward_op if not backward else ("$lt" if forward_op == "$gt" else "$gt")
+        clause = {f: cursor[j] for j, (f, _) in enumerate(sort[:i])}
+        clause[field] = {op: cursor[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+async def keyset_page(collection, query: dict, sort, cursor=None, backward: bool = False,
+                      limit: int = 10, projection=None):
+    """
+    Одна страница по индексу без skip: limit+1 документов после (или до) cursor.
+    Возвращает (документы в порядке sort, есть_предыдущая, есть_следующая).
+    """
+    if cursor is not None:
+        query = {"$and": [query, keyset_filter(sort, cursor, backward)]}
+    order = [(f, -d if backward else d) for f, d in sort]
+    docs = await collection.find(query, projection).sort(order).limit(limit + 1).to_list(None)
+    more = len(docs) > limit
+    docs = docs[:limit]
+    if backward:
+        docs.reverse()
+        return docs, more, True
+    return docs, cursor is not None, more
+
+def cursor_of(doc: dict, sort):
+    return tuple(doc[f] for f, _ in sort)
@@ -0,0 +1,17 @@
+# db/players_repo.py
+from db.async_client import get_db
+
+def collection():
+    return get_db().players_cache
+
+async def find_by_tag(bs_tag: str):
+    return await collection().find_one({"bs_tag": bs_tag})
+
+async def bulk_write(ops):
+    return await collection().bulk_write(ops, ordered=False)
+
+async def delete_by_tag(bs_tag: str):
+    await collection().delete_one({"bs_tag": bs_tag})
+
+async def delete_by_tags(bs_tags):
+    await collection().delete_many({"bs_tag": {"$in": list(bs_tags)}})
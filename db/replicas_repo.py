@@ -0,0 +1,15 @@
+# db/replicas_repo.py
+from db.async_client import get_db
+
+def collection():
+    return get_db().replicas
+
+async def heartbeat(replica_id: str, now):
+    await collection().update_one({"_id": replica_id}, {"$set": {"seen_at": now}}, upsert=True)
+
+async def live_ids(since):
+    docs = await collection().find({"seen_at": {"$gt": since}}, {"_id": 1}).sort("_id", 1).to_list(None)
+    return [d["_id"] for d in docs]
+
+async def remove(replica_id: str):
+    await collection().delete_one({"_id": replica_id})
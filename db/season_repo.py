@@ -0,0 +1,21 @@
+# db/season_repo.py
+from pymongo import ReturnDocument
+from db.async_client import get_db
+
+def collection():
+    return get_db().season_config
+
+async def get_current():
+    return await collection().find_one({"_id": "current"})
+
+async def get_or_create(defaults: dict):
+    """
+    Возвращает текущий конфиг сезона, создавая его из defaults при отсутствии.
+    """
+    fields = {k: v for k, v in defaults.items() if k != "_id"}
+    return await collection().find_one_and_update(
+        {"_id": "current"},
+        {"$setOnInsert": fields},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
@@ -0,0 +1,75 @@
+# db/trophy_history_repo.py
+from pymongo import ASCENDING, DESCENDING
+from db.async_client import get_db
+
+# Точки временного ряда: {bs_tag, ts, trophies, res}, res — "raw" | "hour" | "day".
+# Пишутся только при изменении трофеев, поэтому значение в момент t — последняя точка с ts <= t.
+
+def collection():
+    return get_db().trophy_history
+
+async def insert_points(points):
+    if points:
+        await collection().insert_many(points, ordered=False)
+
+async def value_at(bs_tag: str, when):
+    """
+    Трофеи игрока на момент when; если точек раньше нет — первое известное значение после.
+    """
+    doc = await collection().find_one(
+        {"bs_tag": bs_tag, "ts": {"$lte": when}}, {"trophies": 1}, sort=[("ts", DESCENDING)]
+    )
+    if doc is None:
+        doc = await collection().find_one(
+            {"bs_tag": bs_tag, "ts": {"$gt": when}}, {"trophies": 1}, sort=[("ts", ASCENDING)]
+        )
+    return doc["trophies"] if doc else None
+
+async def _first_per_tag(match: dict, ts_order: int):
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"bs_tag": 1, "ts": ts_order}},
+        {"$group": {"_id": "$bs_tag", "trophies": {"$first": "$trophies"}}}
+    ]
+    return {d["_id"]: d["trophies"] async for d in collection().aggregate(pipeline)}
+
+async def latest_values(bs_tags):
+    """
+    {tag: последнее записанное значение}.
+    """
+    return await _first_per_tag({"bs_tag": {"$in": list(bs_tags)}}, -1)
+
+async def values_at(bs_tags, when):
+    """
+    То же, что value_at, но для многих игроков за два aggregation-запроса.
+    """
+    bs_tags = list(bs_tags)
+    values = await _first_per_tag({"bs_tag": {"$in": bs_tags}, "ts": {"$lte": when}}, -1)
+    missing = [t for t in bs_tags if t not in values]
+    if missing:
+        values.update(await _first_per_tag({"bs_tag": {"$in": missing}, "ts": {"$gt": when}}, 1))
+    return values
+
+async def downsample(from_res: str, to_res: str, unit: str, older_than):
+    """
+    Оставляет по одной (последней) точке на игрока в каждом интервале unit ("hour"/"day")
+    среди точек from_res старше older_than; оставшиеся помечаются как to_res.
+    """
+    match = {"res": from_res, "ts": {"$lt": older_than}}
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"ts": 1}},
+        {"$group": {
+            "_id": {"bs_tag": "$bs_tag", "bucket": {"$dateTrunc": {"date": "$ts", "unit": unit}}},
+            "keep": {"$last": "$_id"}
+        }}
+    ]
+    keep = [d["keep"] async for d in collection().aggregate(pipeline, allowDiskUse=True)]
+    if not keep:
+        return 0
+    await collection().update_many({"_id": {"$in": keep}}, {"$set": {"res": to_res}})
+    result = await collection().delete_many({**match, "_id": {"$nin": keep}})
+    return result.deleted_count
+
+async def delete_by_tags(bs_tags):
+    await collection().delete_many({"bs_tag": {"$in": list(bs_tags)}})
@@ -0,0 +1,57 @@
+# db/users_repo.py
+from pymongo import ReturnDocument, ASCENDING
+from db.async_client import get_db
+from db.pagination import keyset_page, search_filter
+
+PAGE_SORT = [("_id", ASCENDING)]
+
+def collection():
+    return get_db().users
+
+async def find_by_tg_id(tg_id: int):
+    return await collection().find_one({"tg_id": tg_id})
+
+async def find_approved_by_username(username: str):
+    return await collection().find_one({"tg_username": username, "status": "approved"})
+
+async def find_approved_by_tag(bs_tag: str):
+    return await collection().find_one({"bs_tag": bs_tag, "status": "approved"})
+
+async def approved_tags(bs_tags):
+    docs = await collection().find({"bs_tag": {"$in": list(bs_tags)}, "status": "approved"}, {"bs_tag": 1}).to_list(None)
+    return {d["bs_tag"] for d in docs}
+
+async def list_by_status(status: str, projection=None):
+    return await collection().find({"status": status}, projection).to_list(None)
+
+async def upsert_registration(tg_id: int, fields: dict):
+    await collection().update_one({"tg_id": tg_id}, {"$set": fields}, upsert=True)
+
+async def set_status(tg_id: int, status: str):
+    """
+    Меняет статус пользователя и возвращает обновлённый документ (или None).
+    """
+    return await collection().find_one_and_update(
+        {"tg_id": tg_id}, {"$set": {"status": status}}, return_document=ReturnDocument.AFTER
+    )
+
+async def delete_by_tg_id(tg_id: int):
+    """
+    Удаляет пользователя и возвращает удалённый документ (или None).
+    """
+    return await collection().find_one_and_delete({"tg_id": tg_id})
+
+async def set_join_club_date(bs_tags, when):
+    await collection().update_many({"bs_tag": {"$in": list(bs_tags)}}, {"$set": {"join_club_date": when}})
+
+async def set_viewed_at(bs_tag: str, when):
+    await collection().update_many({"bs_tag": bs_tag, "status": "approved"}, {"$set": {"viewed_at": when}})
+
+async def delete_by_tags(bs_tags):
+    await collection().delete_many({"bs_tag": {"$in": list(bs_tags)}})
+
+async def page_by_status(status: str, cursor=None, backward: bool = False, search: str = None, limit: int = 10):
+    query = {"status": status}
+    if search:
+        query = {"$and": [query, search_filter(search, "real_name")]}
+    return await keyset_page(collection(), query, PAGE_SORT, cursor, backward, limit)
@@ -1,16 +1,38 @@
 # handlers/admin_handlers.py
 import os
+import csv
+import json
 import logging
-from datetime import datetime, timezone
+import tempfile
+from datetime import datetime, timezone, timedelta
+from bson import ObjectId
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 import asyncio
-from db.mongo_client import db
-from api.brawl_api import get_player
+from db import users_repo, players_repo, club_repo
+from api.brawl_api import fetch_player
 from utils.time_utils import format_moscow_date
+from utils.validators import clean_tag
+from utils import leaderboard, user_cache, clubs, notify
 
 ADMIN_ID = int(os.getenv("ADMIN_USER_ID")) if os.getenv("ADMIN_USER_ID") else None
 
+# Размер страницы в /ACK и /we (кнопки) и в /history (строки)
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "10"))
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Выгрузка истории читается из БД пачками такого размера
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+HISTORY_COLUMNS = ["timestamp", "club_tag", "bs_tag", "name", "event"]
+MONTHLY_COLUMNS = ["month", "club_tag", "joined", "left"]
+EXPORT_USAGE = (
+    "❌ Формат: /export_history [csv|jsonl] [#ТЕГ] [с дд.мм.гггг] [по дд.мм.гггг]\n"
+    "или /export_history [csv|jsonl] monthly — месячные сводки выгружаются целиком, без фильтров\n"
+    "Начало не позже конца; «с»/«по» можно не писать: две даты подряд — начало и конец."
+)
+
 WAITING_FOR_SEASON_START, WAITING_FOR_SEASON_END, WAITING_FOR_NORM = range(3)
 
 async def admin_only(update: Update):
@@ -18,28 +40,103 @@ async def admin_only(update: Update):
         return False
     return True
 
+# --- Постраничные списки ---
+# Курсор — ключ последней (или первой) записи на странице, он едет в callback_data:
+# "<prefix>_n_<cursor>" — следующая страница, "<prefix>_p_<cursor>" — предыдущая.
+def command_search(context: ContextTypes.DEFAULT_TYPE, key: str):
+    """
+    Фильтр из аргументов команды (/we медв), запоминается для листания страниц.
+    """
+    search = " ".join(context.args or []).strip() or None
+    context.user_data[key] = search
+    return search
+
+def parse_page(data: str):
+    _, direction, cursor = data.split("_", 2)
+    return cursor, direction == "p"
+
+def nav_row(prefix: str, docs, has_prev: bool, has_next: bool, encode):
+    row = []
+    if has_prev:
+        row.append(InlineKeyboardButton("◀️ Назад", callback_data=f"{prefix}_p_{encode(docs[0])}"))
+    if has_next:
+        row.append(InlineKeyboardButton("Дальше ▶️", callback_data=f"{prefix}_n_{encode(docs[-1])}"))
+    return row
+
+def encode_user_cursor(user: dict) -> str:
+    return str(user["_id"])
+
+def decode_user_cursor(cursor: str):
+    return (ObjectId(cursor),)
+
+def encode_history_cursor(event: dict) -> str:
+    ts = event["timestamp"]
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return f"{(ts - EPOCH) // timedelta(milliseconds=1)}_{event['_id']}"
+
+def decode_history_cursor(cursor: str):
+    ms, oid = cursor.split("_")
+    return (EPOCH + timedelta(milliseconds=int(ms)), ObjectId(oid))
+
+async def show_page(update: Update, render, cursor=None, backward: bool = False):
+    """
+    Рисует страницу: новым сообщением на команду или правкой сообщения на нажатие кнопки.
+    Если страница опустела (список изменился), показывает первую.
+    """
+    page = await render(cursor, backward)
+    if page is None and cursor is not None:
+        page = await render(None, False)
+    text, markup = page
+    query = update.callback_query
+    if query:
+        await query.edit_message_text(text, reply_markup=markup)
+    else:
+        await update.message.reply_text(text, reply_markup=markup)
+
+def search_line(search) -> str:
+    return f"🔎 Фильтр: {search}\n\n" if search else ""
+
 # --- /ACK ---
+def ack_renderer(search):
+    async def render(cursor, backward):
+        pending, has_prev, has_next = await users_repo.page_by_status(
+            "pending", cursor and decode_user_cursor(cursor), backward, search, ADMIN_PAGE_SIZE
+        )
+        if not pending:
+            if cursor is not None:
+                return None
+            return ("🔎 Никого не найдено." if search else "✅ Нет ожидающих подтверждения."), None
+
+        text = "🐻 МЕДВЕЖАТА | ОЖИДАЮЩИЕ ПОДТВЕРЖДЕНИЯ 🐾\n\n" + search_line(search)
+        buttons = []
+        for u in pending:
+            name = u['real_name']
+            tag = u['bs_tag']
+            username = u.get('tg_username', '—')
+            text += f"🧑‍🦰 {name} (#{tag}) — @{username}\n"
+            buttons.append(InlineKeyboardButton(name, callback_data=f"ack_user_{u['tg_id']}"))
+
+        keyboard = [buttons[i:i+2] for i in range(0, len(buttons), 2)]
+        nav = nav_row("ackpg", pending, has_prev, has_next, encode_user_cursor)
+        if nav:
+            keyboard.append(nav)
+        keyboard.append([InlineKeyboardButton("⬅️ Назад", callback_data="ack_back")])
+        return text, InlineKeyboardMarkup(keyboard)
+    return render
+
 async def ack(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await admin_only(update):
         return
+    await show_page(update, ack_renderer(command_search(context, "ack_search")))
 
-    pending = list(db.users.find({"status": "pending"}))
-    if not pending:
-        await update.message.reply_text("✅ Нет ожидающих подтверждения.")
+async def ack_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    if not await admin_only(update):
         return
-
-    text = "🐻 МЕДВЕЖАТА | ОЖИДАЮЩИЕ ПОДТВЕРЖДЕНИЯ 🐾\n\n"
-    buttons = []
-    for u in pending:
-        name = u['real_name']
-        tag = u['bs_tag']
-        username = u.get('tg_username', '—')
-        text += f"🧑‍🦰 {name} (#{tag}) — @{username}\n"
-        buttons.append(InlineKeyboardButton(name, callback_data=f"ack_user_{u['tg_id']}"))
-
-    keyboard = [buttons[i:i+2] for i in range(0, len(buttons), 2)]
-    keyboard.append([InlineKeyboardButton("⬅️ Назад", callback_data="ack_back")])
-    await update.message.reply_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+    cursor, backward = parse_page(query.data)
+    await show_page(update, ack_renderer(context.user_data.get("ack_search")), cursor, backward)
 
 async def ack_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
@@ -48,7 +145,7 @@ async def ack_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if data.startswith("ack_user_"):
         tg_id = int(data.split("_")[-1])
-        user = db.users.find_one({"tg_id": tg_id})
+        user = await users_repo.find_by_tg_id(tg_id)
         if not user:
             await query.edit_message_text("❌ Пользователь не найден.")
             return
@@ -71,26 +168,25 @@ async def approve_reject_whois(update: Update, context: ContextTypes.DEFAULT_TYP
 
     if data.startswith("approve_"):
         tg_id = int(data.split("_")[1])
-        db.users.update_one({"tg_id": tg_id}, {"$set": {"status": "approved"}})
-        try:
-            await context.bot.send_message(tg_id, "✅ Поздравляем! Вы приняты в клуб «МЕДВЕЖАТА»! 🎉\nТеперь доступны все команды.")
-        except:
-            pass
+        await users_repo.set_status(tg_id, "approved")
+        await user_cache.invalidate(tg_id)
+        await leaderboard.add_user(tg_id)
+        await notify.send(tg_id, "✅ Поздравляем! Вы приняты в клуб «МЕДВЕЖАТА»! 🎉\nТеперь доступны все команды.")
         await query.edit_message_text("✅ Пользователь принят.")
 
     elif data.startswith("reject_"):
         tg_id = int(data.split("_")[1])
-        db.users.update_one({"tg_id": tg_id}, {"$set": {"status": "rejected"}})
-        try:
-            await context.bot.send_message(tg_id, "❌ Ваша регистрация отклонена администратором.")
-        except:
-            pass
+        user = await users_repo.set_status(tg_id, "rejected")
+        await user_cache.invalidate(tg_id)
+        if user:
+            await leaderboard.remove([user["bs_tag"]])
+        await notify.send(tg_id, "❌ Ваша регистрация отклонена администратором.")
         await query.edit_message_text("❌ Пользователь отклонён.")
 
     elif data.startswith("whois_"):
         bs_tag = data.split("_", 1)[1]
         try:
-            player = await asyncio.to_thread(get_player, bs_tag)
+            player = await fetch_player(bs_tag)
             msg = (
                 f"🔍 Информация об игроке:\n"
                 f"Ник: {player['name']}\n"
@@ -103,43 +199,163 @@ async def approve_reject_whois(update: Update, context: ContextTypes.DEFAULT_TYP
             await query.message.reply_text(f"❌ Ошибка: {e}")
 
 # --- /history ---
+def history_renderer(search):
+    async def render(cursor, backward):
+        events, has_prev, has_next = await club_repo.history_page(
+            cursor and decode_history_cursor(cursor), backward, search, HISTORY_PAGE_SIZE
+        )
+        if not events:
+            if cursor is not None:
+                return None
+            return ("🔎 Ничего не найдено." if search else "📜 История пуста."), None
+
+        text = "🐻 МЕДВЕЖАТА | ИСТОРИЯ 📜\n\n" + search_line(search)
+        for e in events:
+            dt = format_moscow_date(e["timestamp"])
+            # Для филиалов показываем тег клуба
+            club = f" #{e['club_tag']}" if e.get("club_tag", clubs.MAIN_CLUB_TAG) != clubs.MAIN_CLUB_TAG else ""
+            event_text = f"присоединился к клубу{club} 🐾" if e["event"] == "joined" else f"покинул клуб{club} ❌"
+            text += f"{dt} — {e['name']} (#{e['bs_tag']}) {event_text}\n"
+
+        nav = nav_row("histpg", events, has_prev, has_next, encode_history_cursor)
+        return text, InlineKeyboardMarkup([nav]) if nav else None
+    return render
+
 async def history(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await admin_only(update):
         return
+    await show_page(update, history_renderer(command_search(context, "history_search")))
 
-    events = list(db.club_history.find().sort("timestamp", -1).limit(20))
-    if not events:
-        await update.message.reply_text("📜 История пуста.")
+async def history_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    if not await admin_only(update):
         return
+    cursor, backward = parse_page(query.data)
+    await show_page(update, history_renderer(context.user_data.get("history_search")), cursor, backward)
+
+# --- /export_history ---
+def parse_export_args(args):
+    """
+    Возвращает (формат, месячные сводки?, фильтр событий). Даты — по Москве, включительно:
+    «с 01.01.2026 по 31.01.2026», «по 31.01.2026» или просто две даты подряд.
+    Неизвестный аргумент, начало позже конца или фильтр вместе с monthly — ValueError.
+    """
+    fmt, monthly, query = "csv", False, {}
+    bounds, bound = {}, None
+    for arg in args:
+        if arg.lower() in ("csv", "jsonl"):
+            fmt = arg.lower()
+        elif arg.lower() == "monthly":
+            monthly = True
+        elif arg.startswith("#"):
+            query["bs_tag"] = clean_tag(arg)
+        elif arg.lower() in ("с", "по"):
+            bound = "start" if arg.lower() == "с" else "end"
+        else:
+            moscow_midnight = datetime.strptime(arg, "%d.%m.%Y").replace(tzinfo=timezone.utc)
+            bound = bound or ("end" if "start" in bounds else "start")
+            if bound in bounds:
+                raise ValueError("too many dates")
+            bounds[bound] = moscow_midnight - timedelta(hours=3)
+            bound = None
+    if bound:
+        raise ValueError("missing date")
+    if monthly and (bounds or query):
+        raise ValueError("monthly export has no filters")
+    if "start" in bounds and "end" in bounds and bounds["start"] > bounds["end"]:
+        raise ValueError("start date after end date")
+    if bounds:
+        query["timestamp"] = {}
+    if "start" in bounds:
+        query["timestamp"]["$gte"] = bounds["start"]
+    if "end" in bounds:
+        query["timestamp"]["$lt"] = bounds["end"] + timedelta(days=1)
+    return fmt, monthly, query
 
-    text = "🐻 МЕДВЕЖАТА | ИСТОРИЯ 📜\n\n"
-    for e in events:
-        dt = format_moscow_date(e["timestamp"])
-        event_text = "присоединился к клубу 🐾" if e["event"] == "joined" else "покинул клуб ❌"
-        text += f"{dt} — {e['name']} (#{e['bs_tag']}) {event_text}\n"
+def export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
 
-    await update.message.reply_text(text)
+async def write_export(path: str, cursor, columns, fmt: str) -> int:
+    """
+    Пишет документы курсора в файл по одному — в памяти не больше одной пачки курсора.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f) if fmt == "csv" else None
+        if writer:
+            writer.writerow(columns)
+        async for doc in cursor:
+            values = [export_value(doc.get(c)) for c in columns]
+            if writer:
+                writer.writerow(values)
+            else:
+                f.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+async def export_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await admin_only(update):
+        return
+    try:
+        fmt, monthly, query = parse_export_args(context.args or [])
+    except ValueError:
+        await update.message.reply_text(EXPORT_USAGE)
+        return
+
+    if monthly:
+        cursor, columns, name = club_repo.iter_monthly(EXPORT_BATCH_SIZE), MONTHLY_COLUMNS, "club_history_monthly"
+    else:
+        cursor, columns, name = club_repo.iter_history(query, EXPORT_BATCH_SIZE), HISTORY_COLUMNS, "club_history"
+    filename = f"{name}_{datetime.now(timezone.utc):%Y%m%d}.{fmt}"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, filename)
+        count = await write_export(path, cursor, columns, fmt)
+        if not count:
+            await update.message.reply_text("📜 Нечего выгружать.")
+            return
+        with open(path, "rb") as f:
+            await update.message.reply_document(f, filename=filename, caption=f"📜 Записей: {count}")
 
 # --- /we ---
+def we_renderer(search):
+    async def render(cursor, backward):
+        users, has_prev, has_next = await users_repo.page_by_status(
+            "approved", cursor and decode_user_cursor(cursor), backward, search, ADMIN_PAGE_SIZE
+        )
+        if not users:
+            if cursor is not None:
+                return None
+            return ("🔎 Никого не найдено." if search else "👥 Нет участников."), None
+
+        buttons = [InlineKeyboardButton(u["real_name"], callback_data=f"we_user_{u['tg_id']}") for u in users]
+        keyboard = [buttons[i:i+2] for i in range(0, len(buttons), 2)]
+        nav = nav_row("wepg", users, has_prev, has_next, encode_user_cursor)
+        if nav:
+            keyboard.append(nav)
+        return search_line(search) + "Выберите игрока:", InlineKeyboardMarkup(keyboard)
+    return render
+
 async def we(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await admin_only(update):
         return
+    await show_page(update, we_renderer(command_search(context, "we_search")))
 
-    users = list(db.users.find({"status": "approved"}))
-    if not users:
-        await update.message.reply_text("👥 Нет участников.")
+async def we_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    if not await admin_only(update):
         return
-
-    buttons = [InlineKeyboardButton(u["real_name"], callback_data=f"we_user_{u['tg_id']}") for u in users]
-    keyboard = [buttons[i:i+2] for i in range(0, len(buttons), 2)]
-    await update.message.reply_text("Выберите игрока:", reply_markup=InlineKeyboardMarkup(keyboard))
+    cursor, backward = parse_page(query.data)
+    await show_page(update, we_renderer(context.user_data.get("we_search")), cursor, backward)
 
 async def we_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     tg_id = int(query.data.split("_")[-1])
 
-    user = db.users.find_one({"tg_id": tg_id})
+    user = await users_repo.find_by_tg_id(tg_id)
     if not user:
         await query.edit_message_text("❌ Не найден.")
         return
@@ -164,8 +380,11 @@ async def we_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     elif data.startswith("we_del_"):
         tg_id = int(data.split("_")[-1])
-        db.users.delete_one({"tg_id": tg_id})
-        db.players_cache.delete_one({"bs_tag": db.users.find_one({"tg_id": tg_id})["bs_tag"]})
+        deleted = await users_repo.delete_by_tg_id(tg_id)
+        await user_cache.invalidate(tg_id)
+        if deleted:
+            await players_repo.delete_by_tag(deleted["bs_tag"])
+            await leaderboard.remove([deleted["bs_tag"]])
         await query.edit_message_text("✅ Удалено.")
 
 # --- /season ---
@@ -179,7 +398,7 @@ async def season(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # --- Register handlers ---
 __all__ = [
-    "ack", "ack_callback", "approve_reject_whois",
-    "history", "we", "we_callback", "we_action",
+    "ack", "ack_page", "ack_callback", "approve_reject_whois",
+    "history", "history_page", "export_history", "we", "we_page", "we_callback", "we_action",
     "season"
 ]
\ No newline at end of file
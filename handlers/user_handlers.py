@@ -1,17 +1,22 @@
 # handlers/user_handlers.py
 import os
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import asyncio
-from db.mongo_client import db
-from utils.validators import is_valid_tag, clean_tag, is_in_club
+from db import users_repo, leaderboard_repo
+from utils.validators import is_valid_tag, clean_tag
+from utils.roster import check_membership, Membership
 from utils.season import get_season_config, days_until_end
 from utils.time_utils import format_moscow_date
+from jobs.refresh_scheduler import mark_viewed
+from jobs.player_updater import refresh_player
+from utils.club_stats import get_stats
+from utils import assets, user_cache, trophy_history, clubs, notify, leaderboard_snapshot
 
-def get_user_status(tg_id):
-    user = db.users.find_one({"tg_id": tg_id})
+async def get_user_status(tg_id):
+    user = await user_cache.get_user(tg_id)
     return user.get("status") if user else None
 
 # ✅ ИСПРАВЛЕНА ФУНКЦИЯ ОТПРАВКИ ФОТО
@@ -20,10 +25,7 @@ async def send_photo_or_text(update: Update, photo_name: str, caption: str):
     Отправляет изображение из папки assets, если оно существует.
     Иначе — отправляет только текст.
     """
-    photo_path = os.path.join("assets", photo_name)
-    if os.path.isfile(photo_path):
-        await update.message.reply_photo(photo=photo_path, caption=caption)
-    else:
+    if not await assets.send_photo(update.message, photo_name, caption):
         await update.message.reply_text(caption)
 
 # --- /start ---
@@ -65,53 +67,46 @@ async def register(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     clean_bs_tag = clean_tag(tag)
 
-    if not await asyncio.to_thread(is_in_club, clean_bs_tag):
+    membership = await check_membership(clean_bs_tag)
+    if membership is Membership.UNKNOWN:
+        await update.message.reply_text("⚠️ Не удалось проверить состав клуба. Попробуй через пару минут.")
+        return
+    if membership is Membership.NOT_MEMBER:
         await update.message.reply_text("❌ Игрок не состоит в клубе «МЕДВЕЖАТА»!")
         return
 
     user = update.effective_user
-    db.users.update_one(
-        {"tg_id": user.id},
+    await users_repo.upsert_registration(
+        user.id,
         {
-            "$set": {
-                "tg_id": user.id,
-                "tg_username": user.username,
-                "real_name": real_name,
-                "bs_tag": clean_bs_tag,
-                "status": "pending",
-                "join_bot_date": datetime.now(timezone.utc),
-                "join_club_date": datetime.now(timezone.utc)
-            }
-        },
-        upsert=True
+            "tg_id": user.id,
+            "tg_username": user.username,
+            "real_name": real_name,
+            "bs_tag": clean_bs_tag,
+            "status": "pending",
+            "join_bot_date": datetime.now(timezone.utc),
+            "join_club_date": datetime.now(timezone.utc)
+        }
     )
+    await user_cache.invalidate(user.id)
 
     # Уведомление админу
-    admin_id = os.getenv("ADMIN_USER_ID")
-    if admin_id:
-        try:
-            keyboard = [
-                [
-                    InlineKeyboardButton("✅ Принять", callback_data=f"approve_{user.id}"),
-                    InlineKeyboardButton("🔍 Кто это?", callback_data=f"whois_{clean_bs_tag}"),
-                    InlineKeyboardButton("❌ Отклонить", callback_data=f"reject_{user.id}")
-                ]
-            ]
-            msg = (
-                f"🐻 МЕДВЕЖАТА | РЕГИСТРАЦИЯ\n"
-                f"Имя: {real_name}\n"
-                f"Тег: #{clean_bs_tag}\n"
-                f"Telegram: @{user.username or '—'}\n"
-                f"Дата запроса: {format_moscow_date(datetime.now(timezone.utc))}\n\n"
-                f"👉 Выберите действие:"
-            )
-            await context.bot.send_message(
-                chat_id=int(admin_id),
-                text=msg,
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-        except Exception as e:
-            logging.error(f"Не удалось отправить админу: {e}")
+    keyboard = [
+        [
+            InlineKeyboardButton("✅ Принять", callback_data=f"approve_{user.id}"),
+            InlineKeyboardButton("🔍 Кто это?", callback_data=f"whois_{clean_bs_tag}"),
+            InlineKeyboardButton("❌ Отклонить", callback_data=f"reject_{user.id}")
+        ]
+    ]
+    msg = (
+        f"🐻 МЕДВЕЖАТА | РЕГИСТРАЦИЯ\n"
+        f"Имя: {real_name}\n"
+        f"Тег: #{clean_bs_tag}\n"
+        f"Telegram: @{user.username or '—'}\n"
+        f"Дата запроса: {format_moscow_date(datetime.now(timezone.utc))}\n\n"
+        f"👉 Выберите действие:"
+    )
+    await notify.notify_admin(msg, InlineKeyboardMarkup(keyboard))
 
     await send_photo_or_text(
         update, "register.jpg",
@@ -121,7 +116,7 @@ async def register(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # --- /navigator ---
 async def navigator(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if get_user_status(update.effective_user.id) != "approved":
+    if await get_user_status(update.effective_user.id) != "approved":
         await update.message.reply_text(
             "❌ Сначала зарегистрируйся и дождись подтверждения админа! Используй /register"
         )
@@ -141,23 +136,35 @@ async def navigator(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     await update.message.reply_text("Меню:", reply_markup=InlineKeyboardMarkup(keyboard))
 
+async def load_stats(user: dict):
+    """
+    Строка рейтинга игрока. Если игрок ещё не попал в цикл обновления (только что подтверждён,
+    первый запуск) — один живой запрос к API вместо отказа.
+    """
+    stats = await leaderboard_repo.find_by_tag(user["bs_tag"])
+    if stats is None:
+        stats = await refresh_player(user["bs_tag"])
+    return stats
+
 # --- /me ---
 async def me(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if get_user_status(update.effective_user.id) != "approved":
+    user = await user_cache.get_user(update.effective_user.id)
+    if not user or user.get("status") != "approved":
         await update.message.reply_text("❌ Сначала зарегистрируйся и дождись подтверждения.")
         return
 
-    user = db.users.find_one({"tg_id": update.effective_user.id})
-    cache = db.players_cache.find_one({"bs_tag": user["bs_tag"]})
-    if not cache:
+    await mark_viewed(user["bs_tag"])
+    stats = await load_stats(user)
+    if not stats:
         await update.message.reply_text("⚠️ Данные ещё не загружены. Попробуй через минуту.")
         return
 
-    config = get_season_config()
+    config = await get_season_config()
     norm = user.get("custom_norm", config["base_norm"])
-    current = cache["trophies"]
-    progress = current
-    percent = min(100, round(progress / norm * 100)) if norm > 0 else 0
+    current = stats["trophies"]
+    season_start = stats.get("season_start", current)
+    progress = current - season_start
+    day_gain = await trophy_history.gain_since(stats["bs_tag"], current, timedelta(hours=24))
 
     if progress >= norm:
         status_emoji = "✅"
@@ -169,7 +176,7 @@ async def me(update: Update, context: ContextTypes.DEFAULT_TYPE):
         status_emoji = "❌"
         status_text = "Нет"
 
-    days, hours = days_until_end()
+    days, hours = await days_until_end()
 
     text = (
         f"🐻 МЕДВЕЖАТА | МОЙ ПРОФИЛЬ 🐻\n\n"
@@ -180,14 +187,15 @@ async def me(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"ID: {update.effective_user.id}\n"
         f"В боте с: {format_moscow_date(user['join_bot_date'])} 📅\n\n"
         f"🎮 ИГРОВАЯ ИНФОРМАЦИЯ:\n"
-        f"Ник в игре: {cache['name']} 🐻\n"
+        f"Ник в игре: {stats['name']} 🐻\n"
         f"ID аккаунта: #{user['bs_tag']}\n"
         f"Клуб: «МЕДВЕЖАТА» 🛡️\n"
         f"В клубе с: {format_moscow_date(user.get('join_club_date', user['join_bot_date']))} 📆\n\n"
         f"📊 СЕЗОННАЯ СТАТИСТИКА:\n"
         f"Норма трофеев: {norm} 🎯\n"
-        f"Начало сезона: 0 кубков 📈\n"
-        f"Текущий прогресс: {current} кубков (+{progress}) 🚀\n"
+        f"Начало сезона: {season_start} кубков 📈\n"
+        f"Текущий прогресс: {current} кубков ({progress:+}) 🚀\n"
+        f"За 24 часа: {day_gain:+} кубков 📆\n"
         f"Норма выполнена: {status_emoji} {status_text}\n"
         f"Дней до конца сезона: {days} дней ({hours} часов) ⏳"
     )
@@ -195,7 +203,7 @@ async def me(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # --- /you ---
 async def you(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if get_user_status(update.effective_user.id) != "approved":
+    if await get_user_status(update.effective_user.id) != "approved":
         await update.message.reply_text("❌ Сначала зарегистрируйся и дождись подтверждения.")
         return
 
@@ -207,10 +215,10 @@ async def you(update: Update, context: ContextTypes.DEFAULT_TYPE):
     db_user = None
 
     if query.startswith("@"):
-        db_user = db.users.find_one({"tg_username": query[1:], "status": "approved"})
+        db_user = await users_repo.find_approved_by_username(query[1:])
     elif query.startswith("#"):
         clean_tag_val = clean_tag(query)
-        db_user = db.users.find_one({"bs_tag": clean_tag_val, "status": "approved"})
+        db_user = await users_repo.find_approved_by_tag(clean_tag_val)
     else:
         await update.message.reply_text("❌ Используй @username или #Тег")
         return
@@ -219,16 +227,18 @@ async def you(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Игрок не найден или не подтверждён.")
         return
 
-    cache = db.players_cache.find_one({"bs_tag": db_user["bs_tag"]})
-    if not cache:
+    await mark_viewed(db_user["bs_tag"])
+    stats = await load_stats(db_user)
+    if not stats:
         await update.message.reply_text("⚠️ Данные ещё не загружены.")
         return
 
-    config = get_season_config()
+    config = await get_season_config()
     norm = db_user.get("custom_norm", config["base_norm"])
-    current = cache["trophies"]
-    progress = current
-    percent = min(100, round(progress / norm * 100)) if norm > 0 else 0
+    current = stats["trophies"]
+    season_start = stats.get("season_start", current)
+    progress = current - season_start
+    day_gain = await trophy_history.gain_since(stats["bs_tag"], current, timedelta(hours=24))
 
     if progress >= norm:
         status_emoji = "✅"
@@ -237,25 +247,26 @@ async def you(update: Update, context: ContextTypes.DEFAULT_TYPE):
         status_emoji = "❌"
         status_text = "Нет"
 
-    days, hours = days_until_end()
+    days, hours = await days_until_end()
 
     text = (
-        f"🐻 МЕДВЕЖАТА | ПРОФИЛЬ [{cache['name']}] 🐾\n\n"
+        f"🐻 МЕДВЕЖАТА | ПРОФИЛЬ [{stats['name']}] 🐾\n\n"
         f"📅 ОСНОВНАЯ ИНФОРМАЦИЯ:\n"
         f"Имя: {db_user['real_name']} 🎯\n"
-        f"Имя в Telegram: {cache['name']} 🐾\n"
+        f"Имя в Telegram: {stats['name']} 🐾\n"
         f"Username: @{db_user.get('tg_username', '—')}\n"
         f"ID: {db_user['tg_id']}\n"
         f"В боте с: {format_moscow_date(db_user['join_bot_date'])} 📅\n\n"
         f"🎮 ИГРОВАЯ ИНФОРМАЦИЯ:\n"
-        f"Ник в игре: {cache['name']} 🐻\n"
+        f"Ник в игре: {stats['name']} 🐻\n"
         f"ID аккаунта: #{db_user['bs_tag']}\n"
         f"Клуб: «МЕДВЕЖАТА» 🛡️\n"
         f"В клубе с: {format_moscow_date(db_user.get('join_club_date', db_user['join_bot_date']))} 📆\n\n"
         f"📊 СЕЗОННАЯ СТАТИСТИКА:\n"
         f"Норма трофеев: {norm} 🎯\n"
-        f"Начало сезона: 0 кубков 📈\n"
-        f"Текущий прогресс: {current} кубков (+{progress}) 🚀\n"
+        f"Начало сезона: {season_start} кубков 📈\n"
+        f"Текущий прогресс: {current} кубков ({progress:+}) 🚀\n"
+        f"За 24 часа: {day_gain:+} кубков 📆\n"
         f"Норма выполнена: {status_emoji} {status_text}\n"
         f"Дней до конца сезона: {days} дней ({hours} часов) ⏳"
     )
@@ -263,39 +274,29 @@ async def you(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # --- /top ---
 TOP_STATE = 0
-async def top(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if get_user_status(update.effective_user.id) != "approved":
-        await update.message.reply_text("❌ Сначала зарегистрируйся и дождись подтверждения.")
-        return
 
-    users = list(db.users.find({"status": "approved"}))
-    players = []
-    for u in users:
-        cache = db.players_cache.find_one({"bs_tag": u["bs_tag"]})
-        if not cache:
-            continue
-        norm = u.get("custom_norm", get_season_config()["base_norm"])
-        progress = cache["trophies"]
-        players.append({
-            "name": cache["name"],
-            "tag": u["bs_tag"],
-            "trophies": cache["trophies"],
-            "progress": progress,
-            "percent": min(100, round(progress / norm * 100)) if norm > 0 else 0
-        })
-
-    players.sort(key=lambda x: x["trophies"], reverse=True)
+def render_top(rows, order: str) -> str:
     lines = []
-    for i, p in enumerate(players[:10]):
+    for i, p in enumerate(rows):
         medal = ["🥇", "🥈", "🥉"][i] if i < 3 else f"{i+1}."
-        lines.append(f"{medal} [{p['name']}](bs://%23{p['tag']}) — {p['trophies']}")
+        if order == "percent":
+            lines.append(f"{medal} [{p['name']}](bs://%23{p['bs_tag']}) — {p['progress']:+} ({p['percent']}%)")
+        else:
+            lines.append(f"{medal} [{p['name']}](bs://%23{p['bs_tag']}) — {p['trophies']}")
+    title = "🐻 МЕДВЕЖАТА | ТОП ПО ПРОГРЕССУ 📊" if order == "percent" else "🐻 МЕДВЕЖАТА | ТОП ПО КУБКАМ 🏆"
+    return title + "\n\n" + "\n".join(lines)
+
+async def top(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await get_user_status(update.effective_user.id) != "approved":
+        await update.message.reply_text("❌ Сначала зарегистрируйся и дождись подтверждения.")
+        return
 
-    text = "🐻 МЕДВЕЖАТА | ТОП ПО КУБКАМ 🏆\n\n" + "\n".join(lines)
+    snapshot = await leaderboard_snapshot.get()
+    text = leaderboard_snapshot.text(snapshot, "trophies", render_top)
     keyboard = [
-        [InlineKeyboardButton("➡️ Перейти к прогрессу", callback_data="top_progress")],
+        [InlineKeyboardButton("➡️ Перейти к прогрессу", callback_data=f"top_progress:{snapshot['_id']}")],
         [InlineKeyboardButton("🏠 Вернуться в /navigator", callback_data="nav_back")]
     ]
-    context.user_data["top_players"] = players
     await send_photo_or_text(update, "top.jpg", text)
     await update.message.reply_text("Выберите:", reply_markup=InlineKeyboardMarkup(keyboard))
 
@@ -303,55 +304,49 @@ async def top_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    if query.data == "top_progress":
-        players = context.user_data.get("top_players", [])
-        players.sort(key=lambda x: x["percent"], reverse=True)
-        lines = []
-        for i, p in enumerate(players[:10]):
-            medal = ["🥇", "🥈", "🥉"][i] if i < 3 else f"{i+1}."
-            lines.append(f"{medal} [{p['name']}](bs://%23{p['tag']}) — +{p['progress']} ({p['percent']}%)")
+    # "top_progress:<версия снимка>"; кнопки старых сообщений без версии показывают последний снимок
+    action, _, version = query.data.partition(":")
+    snapshot = await leaderboard_snapshot.get(int(version) if version else None)
 
-        text = "🐻 МЕДВЕЖАТА | ТОП ПО ПРОГРЕССУ 📊\n\n" + "\n".join(lines)
+    if action == "top_progress":
+        text = leaderboard_snapshot.text(snapshot, "percent", render_top)
         keyboard = [
-            [InlineKeyboardButton("⬅️ Назад к кубкам", callback_data="top_trophies")],
+            [InlineKeyboardButton("⬅️ Назад к кубкам", callback_data=f"top_trophies:{snapshot['_id']}")],
             [InlineKeyboardButton("🏠 Вернуться в /navigator", callback_data="nav_back")]
         ]
         await query.edit_message_text(text=text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
 
-    elif query.data == "top_trophies":
-        players = context.user_data.get("top_players", [])
-        players.sort(key=lambda x: x["trophies"], reverse=True)
-        lines = []
-        for i, p in enumerate(players[:10]):
-            medal = ["🥇", "🥈", "🥉"][i] if i < 3 else f"{i+1}."
-            lines.append(f"{medal} [{p['name']}](bs://%23{p['tag']}) — {p['trophies']}")
-
-        text = "🐻 МЕДВЕЖАТА | ТОП ПО КУБКАМ 🏆\n\n" + "\n".join(lines)
+    elif action == "top_trophies":
+        text = leaderboard_snapshot.text(snapshot, "trophies", render_top)
         keyboard = [
-            [InlineKeyboardButton("➡️ Перейти к прогрессу", callback_data="top_progress")],
+            [InlineKeyboardButton("➡️ Перейти к прогрессу", callback_data=f"top_progress:{snapshot['_id']}")],
             [InlineKeyboardButton("🏠 Вернуться в /navigator", callback_data="nav_back")]
         ]
         await query.edit_message_text(text=text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
 
 # --- /club ---
 async def club(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if get_user_status(update.effective_user.id) != "approved":
+    if await get_user_status(update.effective_user.id) != "approved":
         await update.message.reply_text("❌ Сначала зарегистрируйся и дождись подтверждения.")
         return
 
-    users = list(db.users.find({"status": "approved"}))
-    config = get_season_config()
-    done = sum(1 for u in users if db.players_cache.find_one({"bs_tag": u["bs_tag"]}, {"trophies": 1}) is not None)
+    stats = await get_stats()
+    config = await get_season_config()
 
-    days, hours = days_until_end()
+    days, hours = await days_until_end()
+    feeders = [tag for tag in await clubs.active_tags() if tag != clubs.MAIN_CLUB_TAG]
+    feeder_line = f"🌱 Филиалы: {', '.join('#' + tag for tag in feeders)}\n" if feeders else ""
+    # Сводка считается по всему рейтингу, то есть по основному клубу вместе с филиалами
+    scope = " (все клубы)" if feeders else ""
 
     text = (
         "🐻 МЕДВЕЖАТА | ИНФОРМАЦИЯ О КЛУБЕ 🛡️\n\n"
         "🏷️ Название: «МЕДВЕЖАТА»\n"
-        f"🏷️ Тег: #{os.getenv('CLUB_TAG')}\n"
-        f"👥 Участников: {len(users)} (0 онлайн) 🐾\n\n"
-        "🏆 Трофеи клуба: 0 (+0 за сезон) 📈\n"
-        f"✅ Норму выполнили: {done} из {len(users)} игроков (0%) 🎯\n\n"
+        f"🏷️ Тег: #{clubs.MAIN_CLUB_TAG}\n"
+        f"{feeder_line}"
+        f"👥 Участников{scope}: {stats['members']} 🐾\n\n"
+        f"🏆 Трофеи клуба{scope}: {stats['total_trophies']} ({stats['season_gain']:+} за сезон) 📈\n"
+        f"✅ Норму выполнили{scope}: {stats['done']} из {stats['members']} игроков ({stats['done_percent']}%) 🎯\n\n"
         f"📆 Сезон:\n"
         f"Начало: {config['start_date'].strftime('%d.%m.%Y')}\n"
         f"Конец: {config['end_date'].strftime('%d.%m.%Y')}\n"
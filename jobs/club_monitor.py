@@ -1,69 +1,162 @@
 # jobs/club_monitor.py
+import time
 import asyncio
 import logging
 from datetime import datetime, timezone
-from api.brawl_api import get_club_members
-from db.mongo_client import db
+from pymongo import UpdateOne, DeleteMany
+from api.brawl_api import fetch_club_members
+from api.rate_limiter import BACKGROUND
+from db import users_repo, players_repo, club_repo, trophy_history_repo
+from utils import leaderboard, user_cache, roster, clubs, coordination, notify
+from utils.metrics import observe_job
+from jobs import refresh_scheduler
 import os
 
-CLUB_TAG = os.getenv("CLUB_TAG")
+# Сколько клубов синхронизируется одновременно
+CLUB_SYNC_CONCURRENCY = int(os.getenv("CLUB_SYNC_CONCURRENCY", "4"))
+# Первая синхронизация после старта (сек)
+FIRST_SYNC_DELAY = float(os.getenv("CLUB_SYNC_FIRST_DELAY", "5"))
+# Сообщать админу о вступлениях и выходах
+NOTIFY_CLUB_CHANGES = os.getenv("NOTIFY_CLUB_CHANGES", "1") == "1"
+
+def diff_roster(current_tags: dict, prev_tags: dict):
+    """
+    Сравнивает текущий состав клуба с сохранённым.
+    Возвращает (вступившие, вышедшие, изменившиеся) — списки тегов.
+    """
+    joined = [tag for tag in current_tags if tag not in prev_tags]
+    left = [tag for tag in prev_tags if tag not in current_tags]
+    changed = [
+        tag for tag, m in current_tags.items()
+        if tag in prev_tags and (
+            prev_tags[tag].get("name") != m["name"] or prev_tags[tag].get("trophies") != m["trophies"]
+        )
+    ]
+    return joined, left, changed
+
+def club_change_text(event: dict) -> str:
+    if event["event"] == "joined":
+        return f"🆕 {event['name']} (#{event['bs_tag']}) присоединился к клубу #{event['club_tag']}"
+    return f"🚪 {event['name']} (#{event['bs_tag']}) покинул клуб #{event['club_tag']}"
+
+async def apply_club_diff(club_tag: str, current_tags: dict, prev_tags: dict, joined, left, changed, now):
+    """
+    Записывает в БД только изменения состава одного клуба: объём записи — O(изменений), а не O(состава).
+    """
+    # Сначала upsert новых/изменившихся, потом удаление ушедших — коллекция никогда не пустеет
+    member_ops = [
+        UpdateOne(
+            {"club_tag": club_tag, "bs_tag": tag},
+            {"$set": {
+                "club_tag": club_tag,
+                "bs_tag": tag,
+                "name": current_tags[tag]["name"],
+                "trophies": current_tags[tag]["trophies"],
+                "last_seen": now
+            }},
+            upsert=True
+        )
+        for tag in joined + changed
+    ]
+    if left:
+        member_ops.append(DeleteMany({"club_tag": club_tag, "bs_tag": {"$in": left}}))
+    if member_ops:
+        await club_repo.write_members(member_ops)
+
+    events = [
+        {"club_tag": club_tag, "bs_tag": tag, "name": current_tags[tag]["name"], "event": "joined", "timestamp": now}
+        for tag in joined
+    ] + [
+        {"club_tag": club_tag, "bs_tag": tag, "name": prev_tags[tag]["name"], "event": "left", "timestamp": now}
+        for tag in left
+    ]
+    if events:
+        await club_repo.insert_history(events)
+        # Первая синхронизация клуба (или новый клуб в реестре) — это весь состав, а не вступления
+        if NOTIFY_CLUB_CHANGES and notify.ADMIN_ID and prev_tags:
+            await notify.send_many([(notify.ADMIN_ID, club_change_text(e)) for e in events])
+
+async def apply_membership_changes(joined, left, now):
+    """
+    Последствия для пользователей бота. joined — пришли в клубы извне, left — не состоят
+    больше ни в одном клубе (переход между основным клубом и филиалом сюда не попадает).
+    """
+    if joined:
+        await users_repo.set_join_club_date(joined, now)
+        await user_cache.invalidate_tags(joined)
+
+    # Каскадное удаление вышедших из всех коллекций
+    if left:
+        refresh_scheduler.forget(left)
+        await users_repo.delete_by_tags(left)
+        await user_cache.invalidate_tags(left)
+        await players_repo.delete_by_tags(left)
+        await leaderboard.remove(left)
+        await trophy_history_repo.delete_by_tags(left)
+
+async def sync_club(club_tag: str, prev_tags: dict, semaphore: asyncio.Semaphore, now):
+    """
+    Синхронизирует один клуб. Возвращает текущий состав или None, если API не ответил.
+    """
+    try:
+        async with semaphore:
+            current_members = await fetch_club_members(club_tag, BACKGROUND)
+    except Exception as e:
+        logging.error(f"❌ Не удалось получить состав клуба #{club_tag}: {e}")
+        return None
+    current_tags = {m["tag"][1:]: m for m in current_members}
+    # Пока ждали API, аренду мог перехватить другой лидер — тогда не пишем
+    if not await coordination.check_fencing():
+        logging.warning(f"⚠️ Аренда лидера потеряна, клуб #{club_tag} не записан.")
+        return None
+
+    joined, left, changed = diff_roster(current_tags, prev_tags)
+    for tag in joined:
+        logging.info(f"🆕 {current_tags[tag]['name']} ({tag}) присоединился к клубу #{club_tag}.")
+    for tag in left:
+        logging.info(f"🚪 {prev_tags[tag]['name']} ({tag}) покинул клуб #{club_tag}.")
+
+    if joined or left or changed:
+        await apply_club_diff(club_tag, current_tags, prev_tags, joined, left, changed, now)
+    await club_repo.mark_synced(club_tag, datetime.now(timezone.utc))
+    return current_tags
 
 async def check_club_changes(context):
     """
-    Проверяет изменения в составе клуба каждые 5 минут.
+    Проверяет изменения в составе всех клубов каждые 5 минут.
     """
     try:
         logging.info("🔁 Запуск check_club_changes...")
-        current_members = await asyncio.to_thread(get_club_members, CLUB_TAG)
-        current_tags = {m["tag"][1:]: m for m in current_members}
-
-        # Получаем предыдущий состав из БД
-        prev_docs = list(db.club_members.find())
-        prev_tags = {doc["bs_tag"]: doc for doc in prev_docs}
-
-        # Логируем новых участников
-        for tag, data in current_tags.items():
-            if tag not in prev_tags:
-                db.club_history.insert_one({
-                    "bs_tag": tag,
-                    "name": data["name"],
-                    "event": "joined",
-                    "timestamp": datetime.now(timezone.utc)
-                })
-                logging.info(f"🆕 {data['name']} ({tag}) присоединился к клубу.")
-
-                # Обновляем дату вступления у пользователя
-                db.users.update_one(
-                    {"bs_tag": tag},
-                    {"$set": {"join_club_date": datetime.now(timezone.utc)}}
-                )
-
-        # Логируем вышедших и удаляем из бота
-        for tag, doc in prev_tags.items():
-            if tag not in current_tags:
-                db.club_history.insert_one({
-                    "bs_tag": tag,
-                    "name": doc["name"],
-                    "event": "left",
-                    "timestamp": datetime.now(timezone.utc)
-                })
-                logging.info(f"🚪 {doc['name']} ({tag}) покинул клуб. Удаляем из бота...")
-                # Удаляем пользователя из всех коллекций
-                db.users.delete_one({"bs_tag": tag})
-                db.players_cache.delete_one({"bs_tag": tag})
-
-        # Обновляем актуальный состав
-        db.club_members.delete_many({})
-        db.club_members.insert_many([
-            {
-                "bs_tag": m["tag"][1:],
-                "name": m["name"],
-                "trophies": m["trophies"],
-                "last_seen": datetime.now(timezone.utc)
-            }
-            for m in current_members
-        ])
-        logging.info("✅ Состав клуба обновлён.")
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        club_tags = await clubs.active_tags()
+
+        # Предыдущий состав всех клубов — одним запросом
+        prev = {tag: {} for tag in club_tags}
+        for doc in await club_repo.list_members(club_tags, {"club_tag": 1, "bs_tag": 1, "name": 1, "trophies": 1}):
+            prev[doc["club_tag"]][doc["bs_tag"]] = doc
+
+        semaphore = asyncio.Semaphore(CLUB_SYNC_CONCURRENCY)
+        results = await asyncio.gather(*(sync_club(tag, prev[tag], semaphore, now) for tag in club_tags))
+
+        # Клуб, который не ответил, считаем неизменившимся
+        prev_all = set().union(*prev.values())
+        current_all = set().union(*(
+            current.keys() if current is not None else prev[tag].keys()
+            for tag, current in zip(club_tags, results)
+        ))
+        joined = sorted(current_all - prev_all)
+        left = sorted(prev_all - current_all)
+        if (joined or left) and await coordination.check_fencing():
+            await apply_membership_changes(joined, left, now)
+
+        roster.update_snapshot(current_all)
+        observe_job("check_club_changes", time.perf_counter() - started)
+        failed = sum(1 for current in results if current is None)
+        logging.info(
+            f"✅ Составы клубов обновлены ({len(club_tags) - failed}/{len(club_tags)}): "
+            f"+{len(joined)} / -{len(left)} игроков бота."
+        )
 
     except Exception as e:
         logging.error(f"❌ Ошибка в check_club_changes: {e}", exc_info=True)
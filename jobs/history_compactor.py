@@ -0,0 +1,39 @@
+# jobs/history_compactor.py
+import os
+import time
+import logging
+from datetime import datetime, timezone, timedelta
+from db import club_repo
+from utils.metrics import observe_job
+
+# Сырые события club_history хранятся столько дней (с точностью до месяца), потом остаются месячные сводки
+HISTORY_KEEP_DAYS = int(os.getenv("CLUB_HISTORY_KEEP_DAYS", "365"))
+
+def month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1, tzinfo=timezone.utc)
+
+async def compact_club_history(context):
+    """
+    Сворачивает события старше HISTORY_KEEP_DAYS в сводки club_history_monthly и удаляет их.
+    Граница выровнена по началу месяца, поэтому каждый месяц сворачивается целиком и один раз.
+    """
+    try:
+        started = time.perf_counter()
+        cutoff = month_start(datetime.now(timezone.utc) - timedelta(days=HISTORY_KEEP_DAYS))
+        counts = await club_repo.monthly_counts_before(cutoff)
+        if not counts:
+            return
+        await club_repo.save_monthly([
+            {
+                "club_tag": c["_id"]["club_tag"],
+                "month": datetime(c["_id"]["year"], c["_id"]["month"], 1, tzinfo=timezone.utc),
+                "joined": c["joined"],
+                "left": c["left"],
+            }
+            for c in counts
+        ])
+        deleted = await club_repo.delete_history_before(cutoff)
+        observe_job("compact_club_history", time.perf_counter() - started)
+        logging.info(f"🗜️ История клуба свёрнута до {cutoff:%m.%Y}: {len(counts)} месячных сводок, удалено {deleted} событий.")
+    except Exception as e:
+        logging.error(f"❌ Ошибка в compact_club_history: {e}", exc_info=True)
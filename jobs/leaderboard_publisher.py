@@ -0,0 +1,22 @@
+# jobs/leaderboard_publisher.py
+import os
+import time
+import logging
+from utils import leaderboard_snapshot, club_stats
+from utils.metrics import observe_job
+
+# Как часто лидер публикует топ и пересчитывает сводку клуба (сек); обновления игроков сами этого не делают
+LEADERBOARD_PUBLISH_SECONDS = float(os.getenv("LEADERBOARD_PUBLISH_SECONDS", "60"))
+
+async def publish_leaderboard(context):
+    """
+    Публикует снимок топа для /top, если он изменился с прошлой версии, и пересчитывает сводку для /club.
+    """
+    try:
+        started = time.perf_counter()
+        await club_stats.recompute()
+        snapshot = await leaderboard_snapshot.publish()
+        observe_job("publish_leaderboard", time.perf_counter() - started)
+        logging.debug(f"🏆 Актуальная версия топа: {snapshot['_id']}")
+    except Exception as e:
+        logging.error(f"❌ Ошибка в publish_leaderboard: {e}", exc_info=True)
@@ -0,0 +1,112 @@
+# jobs/outbox_sender.py
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from telegram import InlineKeyboardMarkup
+from telegram.error import RetryAfter, Forbidden, BadRequest, TelegramError
+from db import outbox_repo
+from utils.metrics import observe_job
+
+# Лимиты Telegram: ~30 сообщений/с на бота и ~1 сообщение/с в один чат
+OUTBOX_TICK_SECONDS = float(os.getenv("OUTBOX_TICK_SECONDS", "1"))
+OUTBOX_GLOBAL_RPS = float(os.getenv("OUTBOX_GLOBAL_RPS", "25"))
+OUTBOX_CHAT_INTERVAL = float(os.getenv("OUTBOX_CHAT_INTERVAL", "1"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+# Сколько первых сообщений одного чата читать за тик для склейки
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "500"))
+MAX_TEXT_LENGTH = 4096
+
+_last_sent = {}        # chat_id -> time.monotonic() последней отправки
+_paused_until = 0.0    # после RetryAfter не шлём ничего до этого момента
+_carry = 0.0
+
+def merge_messages(messages):
+    """
+    Делит сообщения одного чата на отправки: подряд идущие сообщения без кнопок
+    склеиваются, пока текст помещается в одно сообщение Telegram.
+    """
+    groups = []
+    size = 0
+    for m in messages:
+        mergeable = groups and not m["reply_markup"] and not groups[-1][-1]["reply_markup"]
+        if mergeable and size + 2 + len(m["text"]) <= MAX_TEXT_LENGTH:
+            groups[-1].append(m)
+            size += 2 + len(m["text"])
+        else:
+            groups.append([m])
+            size = len(m["text"])
+    return groups
+
+async def send_group(bot, group) -> bool:
+    """
+    Отправляет склеенные сообщения. Возвращает True при успехе.
+    """
+    global _paused_until
+    ids = [m["_id"] for m in group]
+    chat_id = group[0]["chat_id"]
+    markup = InlineKeyboardMarkup.de_json(group[0]["reply_markup"], bot) if group[0]["reply_markup"] else None
+    now = datetime.now(timezone.utc)
+    try:
+        await bot.send_message(chat_id, "\n\n".join(m["text"] for m in group), reply_markup=markup)
+    except RetryAfter as e:
+        # Флуд-контроль Telegram: ждём сколько сказано, попытка не засчитывается
+        delay = e.retry_after
+        _paused_until = max(_paused_until, time.monotonic() + delay)
+        await outbox_repo.reschedule(ids, now + timedelta(seconds=delay), str(e), attempt=False)
+        return False
+    except (Forbidden, BadRequest) as e:
+        # Бот заблокирован, чат не найден и т.п. — повтор не поможет
+        logging.warning(f"⚠️ Сообщение в чат {chat_id} не доставлено: {e}")
+        await outbox_repo.mark_failed(ids, str(e))
+        return False
+    except TelegramError as e:
+        attempts = max(m.get("attempts", 0) for m in group) + 1
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            logging.error(f"❌ Сообщение в чат {chat_id} не отправлено за {attempts} попыток: {e}")
+            await outbox_repo.mark_failed(ids, str(e))
+        else:
+            await outbox_repo.reschedule(ids, now + timedelta(seconds=min(2 ** attempts, 300)), str(e))
+        return False
+    _last_sent[chat_id] = time.monotonic()
+    await outbox_repo.mark_sent(ids)
+    return True
+
+async def send_outbox(context):
+    """
+    Тик отправителя: не больше OUTBOX_GLOBAL_RPS сообщений в секунду и одного сообщения
+    в чат за OUTBOX_CHAT_INTERVAL.
+    """
+    global _carry
+    try:
+        if time.monotonic() < _paused_until:
+            return
+        _carry += OUTBOX_GLOBAL_RPS * OUTBOX_TICK_SECONDS
+        budget = int(_carry)
+        _carry -= budget
+
+        if budget <= 0:
+            return
+
+        now = time.monotonic()
+        for chat_id in [c for c, t in _last_sent.items() if now - t >= OUTBOX_CHAT_INTERVAL]:
+            del _last_sent[chat_id]
+        # Чаты выбираются в БД по одному на позицию, недавно получившие сообщение исключаются сразу —
+        # длинная очередь одного чата не загораживает остальные
+        due_at = datetime.now(timezone.utc)
+        chat_ids = await outbox_repo.due_chats(due_at, _last_sent.keys(), budget)
+        if not chat_ids:
+            return
+        pending = await outbox_repo.due_for_chats(due_at, chat_ids, OUTBOX_BATCH)
+        batch = [merge_messages(pending[chat_id])[0] for chat_id in chat_ids if pending.get(chat_id)]
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(send_group(context.bot, group) for group in batch))
+        sent = sum(results)
+        observe_job("send_outbox", time.perf_counter() - started, sent, len(results) - sent)
+        logging.debug(f"📨 Отправлено {sent} из {len(results)} сообщений в {len(chat_ids)} чатов.")
+    except Exception as e:
+        logging.error(f"❌ Ошибка в send_outbox: {e}", exc_info=True)
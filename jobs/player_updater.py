@@ -1,35 +1,138 @@
 # jobs/player_updater.py
+import os
+import time
 import asyncio
 import logging
 from datetime import datetime, timezone
-from api.brawl_api import get_player
-from db.mongo_client import db
+from pymongo import UpdateOne
+from api.brawl_api import fetch_player
+from api.rate_limiter import BACKGROUND, INTERACTIVE
+from db import users_repo, players_repo, leaderboard_repo
+from utils import leaderboard, trophy_history, coordination, notify
+from utils.metrics import observe_job
+
+# Сколько игроков запрашиваем из API одновременно
+REFRESH_CONCURRENCY = int(os.getenv("REFRESH_CONCURRENCY", "8"))
+
+def player_cache_update(bs_tag: str, player_data: dict) -> UpdateOne:
+    return UpdateOne(
+        {"bs_tag": bs_tag},
+        {
+            "$set": {
+                "bs_tag": bs_tag,
+                "name": player_data["name"],
+                "trophies": player_data["trophies"],
+                "club_tag": player_data.get("club", {}).get("tag", "")[1:] if player_data.get("club") else None,
+                "last_updated": datetime.now(timezone.utc)
+            }
+        },
+        upsert=True
+    )
+
+async def fetch_players(tags, concurrency: int = REFRESH_CONCURRENCY, priority: int = BACKGROUND):
+    """
+    Параллельно запрашивает игроков, не более concurrency запросов одновременно.
+    Возвращает (успешные {tag: data}, ошибки {tag: exception}).
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch_one(tag):
+        async with semaphore:
+            return await fetch_player(tag, priority)
+
+    results = await asyncio.gather(*(fetch_one(tag) for tag in tags), return_exceptions=True)
+    fetched, failed = {}, {}
+    for tag, result in zip(tags, results):
+        if isinstance(result, Exception):
+            failed[tag] = result
+        else:
+            fetched[tag] = result
+    return fetched, failed
+
+# Поля пользователя, нужные для обновления кэша и рейтинга
+USER_FIELDS = {"bs_tag": 1, "tg_id": 1, "custom_norm": 1}
+
+async def refresh_players(users, priority: int = BACKGROUND):
+    """
+    Обновляет кэш, историю трофеев и рейтинг для переданных пользователей.
+    Возвращает (строки рейтинга, ошибки {tag: exception}).
+    """
+    tags = list(dict.fromkeys(u["bs_tag"] for u in users))
+    fetched, failed = await fetch_players(tags, priority=priority)
+    for tag, e in failed.items():
+        logging.error(f"❌ Не удалось обновить игрока {tag}: {e}")
+
+    # Пока шли запросы к API, игрок мог покинуть клуб или быть отклонён — его строки не воскрешаем
+    if fetched:
+        approved = await users_repo.approved_tags(fetched.keys())
+        fetched = {tag: data for tag, data in fetched.items() if tag in approved}
+
+    rows = []
+    if fetched:
+        ops = [player_cache_update(tag, data) for tag, data in fetched.items()]
+        await players_repo.bulk_write(ops)
+        await trophy_history.record(fetched)
+        prev = await leaderboard_repo.find_by_tags(fetched.keys(), {"bs_tag": 1, "progress": 1, "norm": 1})
+        rows = await leaderboard.refresh(users, fetched)
+        await notify_norm_reached(prev, rows)
+    return rows, failed
+
+async def refresh_player(bs_tag: str):
+    """
+    Живое обновление одного игрока для команд: кэш и строка рейтинга, без истории и сводки клуба.
+    Статус перепроверяется по базе, а не по кэшу пользователей. Возвращает строку рейтинга или None.
+    """
+    user = await users_repo.find_approved_by_tag(bs_tag)
+    if not user:
+        return None
+    try:
+        data = await fetch_player(bs_tag, INTERACTIVE)
+    except Exception as e:
+        logging.error(f"❌ Не удалось обновить игрока {bs_tag}: {e}")
+        return None
+    await players_repo.bulk_write([player_cache_update(bs_tag, data)])
+    rows = await leaderboard.refresh([user], {bs_tag: data})
+    return rows[0] if rows else None
+
+async def notify_norm_reached(prev_rows, rows):
+    """
+    Поздравляет игроков, которые в этом обновлении впервые выполнили норму сезона.
+    """
+    prev = {r["bs_tag"]: r for r in prev_rows}
+    reached = [
+        row for row in rows
+        if row["tg_id"] and row["progress"] >= row["norm"]
+        and row["bs_tag"] in prev and prev[row["bs_tag"]]["progress"] < prev[row["bs_tag"]]["norm"]
+    ]
+    if not reached:
+        return
+    messages = [
+        (row["tg_id"], f"🎯 Норма сезона выполнена: +{row['progress']} из {row['norm']} трофеев! Медвежья сила! 🐻💪")
+        for row in reached
+    ]
+    if notify.ADMIN_ID:
+        messages += [
+            (notify.ADMIN_ID, f"🎯 {row['name']} (#{row['bs_tag']}) выполнил норму сезона.")
+            for row in reached
+        ]
+    await notify.send_many(messages)
 
 async def update_players_cache(context):
     """
-    Обновляет кэш данных игроков каждые 5 минут.
+    Полное обновление кэша подтверждённых игроков своей доли (при нескольких репликах).
     """
     try:
         logging.info("🔁 Запуск update_players_cache...")
-        users = list(db.users.find({"status": "approved"}))
-        for user in users:
-            try:
-                player_data = await asyncio.to_thread(get_player, user["bs_tag"])
-                db.players_cache.update_one(
-                    {"bs_tag": user["bs_tag"]},
-                    {
-                        "$set": {
-                            "bs_tag": user["bs_tag"],
-                            "name": player_data["name"],
-                            "trophies": player_data["trophies"],
-                            "club_tag": player_data.get("club", {}).get("tag", "")[1:] if player_data.get("club") else None,
-                            "last_updated": datetime.now(timezone.utc)
-                        }
-                    },
-                    upsert=True
-                )
-            except Exception as e:
-                logging.error(f"❌ Не удалось обновить игрока {user['bs_tag']}: {e}")
-        logging.info("✅ Кэш игроков обновлён.")
+        started = time.perf_counter()
+        users = [u for u in await users_repo.list_by_status("approved", USER_FIELDS) if coordination.owns(u["bs_tag"])]
+
+        rows, failed = await refresh_players(users)
+
+        elapsed = time.perf_counter() - started
+        observe_job("update_players_cache", elapsed, len(rows), len(failed))
+        logging.info(
+            f"✅ Кэш игроков обновлён: {len(rows)} из {len(users)} игроков "
+            f"(ошибок: {len(failed)}) за {elapsed:.1f} с."
+        )
     except Exception as e:
         logging.error(f"❌ Ошибка в update_players_cache: {e}", exc_info=True)
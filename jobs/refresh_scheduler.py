@@ -0,0 +1,172 @@
+# jobs/refresh_scheduler.py
+import os
+import time
+import random
+import logging
+from datetime import datetime, timezone
+from db import users_repo, leaderboard_repo
+from jobs.player_updater import refresh_players, USER_FIELDS
+from utils.metrics import observe_job
+from utils import coordination
+
+# Тик планировщика и бюджет фонового обновления (запросов к API в секунду)
+TICK_SECONDS = float(os.getenv("REFRESH_TICK_SECONDS", "10"))
+REFRESH_BUDGET_RPS = float(os.getenv("REFRESH_BUDGET_RPS", "2"))
+# Границы интервала обновления одного игрока (сек)
+MIN_INTERVAL = float(os.getenv("REFRESH_MIN_INTERVAL", "60"))
+MAX_INTERVAL = float(os.getenv("REFRESH_MAX_INTERVAL", "3600"))
+# Изменение трофеев в час, при котором игрок считается максимально «активным»
+VOLATILITY_REF = float(os.getenv("REFRESH_VOLATILITY_REF", "60"))
+# Сколько секунд после просмотра профиля игрок остаётся приоритетным
+VIEW_WINDOW = float(os.getenv("REFRESH_VIEW_WINDOW", "3600"))
+# Через сколько секунд после просмотра профиля обновить данные
+VIEW_REFRESH_DELAY = float(os.getenv("REFRESH_VIEW_DELAY", "30"))
+# Как часто перечитывать список подтверждённых пользователей (сек)
+ROSTER_RELOAD_SECONDS = float(os.getenv("REFRESH_ROSTER_RELOAD", "60"))
+# Игроки с одинаковой «просроченностью» при старте размазываются на этот интервал (сек)
+STARTUP_SPREAD = float(os.getenv("REFRESH_STARTUP_SPREAD", "60"))
+
+# Время просмотра профиля хранится у пользователя: его видит реплика, которой игрок принадлежит
+ROSTER_FIELDS = {**USER_FIELDS, "viewed_at": 1}
+
+class PlayerState:
+    __slots__ = ("user", "next_due", "refreshed_at", "trophies", "volatility", "viewed_at", "norm_ratio")
+
+    def __init__(self, user: dict, next_due: float):
+        self.user = user
+        self.next_due = next_due
+        self.refreshed_at = None
+        self.trophies = None
+        self.volatility = 0.0   # EWMA |Δтрофеев| в час
+        self.viewed_at = None
+        self.norm_ratio = 0.0   # прогресс / норма
+
+_players = {}  # bs_tag -> PlayerState
+_roster_loaded_at = 0.0
+_partition = None  # (номер реплики, число реплик), для которого загружен список
+_carry = 0.0   # дробный остаток бюджета между тиками
+
+def priority(state: PlayerState, now: float) -> float:
+    """
+    Приоритет 0..1: активность трофеев, недавний просмотр профиля, близость к норме.
+    """
+    volatility = min(1.0, state.volatility / VOLATILITY_REF) if VOLATILITY_REF > 0 else 0.0
+    viewed = 0.0
+    if state.viewed_at is not None:
+        viewed = max(0.0, 1.0 - (now - state.viewed_at) / VIEW_WINDOW)
+    # Ближе всего к норме (50%..100%) — важнее всего; выполнившим норму спешить некуда
+    near_norm = 0.0 if state.norm_ratio >= 1 else max(0.0, (state.norm_ratio - 0.5) / 0.5)
+    return max(volatility, viewed, 0.6 * near_norm)
+
+def next_interval(state: PlayerState, now: float) -> float:
+    interval = MIN_INTERVAL + (MAX_INTERVAL - MIN_INTERVAL) * (1.0 - priority(state, now))
+    # Небольшой джиттер, чтобы обновления не собирались в пачки
+    return interval * random.uniform(0.9, 1.1)
+
+def record_refresh(state: PlayerState, row: dict, now: float):
+    if state.trophies is not None and state.refreshed_at is not None:
+        hours = max((now - state.refreshed_at) / 3600, 1 / 60)
+        rate = abs(row["trophies"] - state.trophies) / hours
+        state.volatility = 0.5 * state.volatility + 0.5 * rate
+    state.trophies = row["trophies"]
+    state.refreshed_at = now
+    state.norm_ratio = row["progress"] / row["norm"] if row.get("norm") else 0.0
+    state.next_due = now + next_interval(state, now)
+
+def apply_view(state: PlayerState, viewed_at: float):
+    if state.viewed_at is None or viewed_at > state.viewed_at:
+        state.viewed_at = viewed_at
+        state.next_due = min(state.next_due, viewed_at + VIEW_REFRESH_DELAY)
+
+async def mark_viewed(bs_tag: str):
+    """
+    Профиль игрока открыли через /me или /you — обновить его скоро и держать данные свежими.
+    Игрок другой реплики (или ещё не загруженный) получает отметку через БД при следующем
+    перечитывании списка, то есть с задержкой до ROSTER_RELOAD_SECONDS.
+    """
+    now = time.time()
+    state = _players.get(bs_tag)
+    if state is not None:
+        apply_view(state, now)
+    else:
+        await users_repo.set_viewed_at(bs_tag, datetime.fromtimestamp(now, timezone.utc))
+
+def first_due(refreshed_at, now: float) -> float:
+    """
+    Первое обновление игрока после старта: никогда не обновлявшиеся — первыми,
+    остальные — в порядке давности прошлого обновления. Всплеска нет: за тик
+    обновляется не больше бюджета.
+    """
+    base = refreshed_at + MIN_INTERVAL if refreshed_at is not None else now - MAX_INTERVAL
+    return base + random.uniform(0, STARTUP_SPREAD)
+
+def forget(bs_tags):
+    """
+    Убирает игроков из планировщика сразу, не дожидаясь перечитывания списка.
+    """
+    for tag in bs_tags:
+        _players.pop(tag, None)
+
+async def reload_roster(now: float):
+    """
+    Перечитывает подтверждённых игроков, оставляя только долю этой реплики.
+    """
+    global _roster_loaded_at, _partition
+    _partition = coordination.partition()
+    users = await users_repo.list_by_status("approved", ROSTER_FIELDS)
+    current = {u["bs_tag"]: u for u in users if coordination.owns(u["bs_tag"])}
+    new_tags = [tag for tag in current if tag not in _players]
+    refreshed = {}
+    if new_tags:
+        rows = await leaderboard_repo.find_by_tags(new_tags, {"bs_tag": 1, "updated_at": 1})
+        refreshed = {r["bs_tag"]: r["updated_at"].timestamp() for r in rows if r.get("updated_at")}
+    for tag in list(_players):
+        if tag not in current:
+            del _players[tag]
+    for tag, user in current.items():
+        if tag in _players:
+            _players[tag].user = user
+        else:
+            _players[tag] = PlayerState(user, first_due(refreshed.get(tag), now))
+        if user.get("viewed_at"):
+            apply_view(_players[tag], user["viewed_at"].timestamp())
+    _roster_loaded_at = now
+
+def pick_due(now: float, budget: int):
+    due = [s for s in _players.values() if s.next_due <= now]
+    due.sort(key=lambda s: s.next_due)
+    return due[:budget]
+
+async def refresh_tick(context):
+    """
+    Тик планировщика: обновляет самых «просроченных» игроков в пределах бюджета API.
+    """
+    global _carry
+    try:
+        now = time.time()
+        # Состав реплик изменился — игроки перераспределяются сразу
+        if now - _roster_loaded_at >= ROSTER_RELOAD_SECONDS or coordination.partition() != _partition:
+            await reload_roster(now)
+
+        # Неиспользованный бюджет не копится — иначе после простоя получится всплеск запросов
+        _carry += REFRESH_BUDGET_RPS * TICK_SECONDS
+        budget = int(_carry)
+        _carry -= budget
+        batch = pick_due(now, budget)
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        rows, failed = await refresh_players([s.user for s in batch])
+        observe_job("refresh_tick", time.perf_counter() - started, len(rows), len(failed))
+        now = time.time()
+        by_tag = {row["bs_tag"]: row for row in rows}
+        for state in batch:
+            row = by_tag.get(state.user["bs_tag"])
+            if row is not None:
+                record_refresh(state, row, now)
+            else:
+                state.next_due = now + MIN_INTERVAL
+        logging.debug(f"🔁 Обновлено {len(rows)} игроков (ошибок: {len(failed)}), в очереди {len(_players)}.")
+    except Exception as e:
+        logging.error(f"❌ Ошибка в refresh_tick: {e}", exc_info=True)
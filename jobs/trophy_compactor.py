@@ -0,0 +1,25 @@
+# jobs/trophy_compactor.py
+import os
+import time
+import logging
+from datetime import datetime, timezone, timedelta
+from db import trophy_history_repo
+from utils.metrics import observe_job
+
+# Сырые точки старше RAW_KEEP_HOURS сжимаются до часовых, часовые старше HOURLY_KEEP_DAYS — до дневных
+RAW_KEEP_HOURS = int(os.getenv("TROPHY_RAW_KEEP_HOURS", "48"))
+HOURLY_KEEP_DAYS = int(os.getenv("TROPHY_HOURLY_KEEP_DAYS", "30"))
+
+async def compact_trophy_history(context):
+    """
+    Даунсемплинг ряда трофеев: raw -> hour -> day.
+    """
+    try:
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        raw = await trophy_history_repo.downsample("raw", "hour", "hour", now - timedelta(hours=RAW_KEEP_HOURS))
+        hourly = await trophy_history_repo.downsample("hour", "day", "day", now - timedelta(days=HOURLY_KEEP_DAYS))
+        observe_job("compact_trophy_history", time.perf_counter() - started)
+        logging.info(f"🗜️ История трофеев сжата: удалено {raw} сырых и {hourly} часовых точек.")
+    except Exception as e:
+        logging.error(f"❌ Ошибка в compact_trophy_history: {e}", exc_info=True)
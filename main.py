@@ -1,46 +1,143 @@
 # main.py
 import os
+import time
+import asyncio
 import logging
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ConversationHandler
 from dotenv import load_dotenv
-from handlers import user_handlers, admin_handlers
-from jobs import club_monitor, player_updater
 
+STARTED = time.perf_counter()
+# .env читается до импорта модулей бота: они берут настройки из окружения при импорте
 load_dotenv()
+
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ConversationHandler
+from handlers import user_handlers, admin_handlers
+from jobs import club_monitor, refresh_scheduler, trophy_compactor, outbox_sender, history_compactor, leaderboard_publisher
+from api import client as brawl_client
+from db import async_client as mongo
+from db.indexes import ensure_indexes
+from web import webhook
+from utils.metrics import timed_handler, start_metrics_server
+from utils import clubs, coordination, warm_start
+
+IMPORTED = time.perf_counter()
 logging.basicConfig(level=logging.INFO)
 
-def main():
-    app = Application.builder().token(os.getenv("BOT_TOKEN")).build()
+# "polling" (по умолчанию) или "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+# Сколько апдейтов обрабатывается одновременно
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "1"))
+
+_background = set()  # ссылки на фоновые задачи старта, чтобы их не собрал GC
+
+def run_in_background(coro):
+    task = asyncio.ensure_future(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+async def build_indexes():
+    started = time.perf_counter()
+    await ensure_indexes(mongo.get_db())
+    logging.info(f"⏱️ Индексы проверены за {time.perf_counter() - started:.2f} с.")
+
+async def on_startup(app: Application):
+    timings = [("импорт", IMPORTED - STARTED), ("сборка и Telegram", time.perf_counter() - IMPORTED)]
+
+    def phase(name: str, started: float) -> float:
+        now = time.perf_counter()
+        timings.append((name, now - started))
+        return now
+
+    t = time.perf_counter()
+    warm = warm_start.load()
+    t = phase("снимок" if warm else "снимок (нет)", t)
+    start_metrics_server()
+    # Индексы существуют после первого запуска — проверка не задерживает ответы
+    run_in_background(build_indexes())
+    await clubs.seed()
+    t = phase("реестр клубов", t)
+    # Лидерство и доля игроков известны до первого запуска задач
+    await coordination.heartbeat(None)
+    phase("аренда", t)
+
+    total = time.perf_counter() - STARTED
+    logging.info(f"🚀 Бот готов за {total:.2f} с: " + " · ".join(f"{name} {sec:.2f}" for name, sec in timings))
+
+async def on_shutdown(app: Application):
+    await warm_start.save()
+    await coordination.resign()
+    await brawl_client.close()
+    mongo.close()
+
+def build_app(request=None) -> Application:
+    """
+    Собирает приложение со всеми хендлерами и задачами.
+    request — необязательная реализация telegram.request.BaseRequest (используется в бенчмарке).
+    """
+    builder = (
+        Application.builder()
+        .token(os.getenv("BOT_TOKEN"))
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+    )
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    if BOT_MODE == "webhook":
+        # Апдейты приходят во встроенный HTTP-сервер, Updater не нужен
+        builder = builder.updater(None)
+    app = builder.build()
 
     # User commands
-    app.add_handler(CommandHandler("start", user_handlers.start))
-    app.add_handler(CommandHandler("help", user_handlers.help_command))
-    app.add_handler(CommandHandler("register", user_handlers.register))
-    app.add_handler(CommandHandler("navigator", user_handlers.navigator))
-    app.add_handler(CommandHandler("me", user_handlers.me))
-    app.add_handler(CommandHandler("you", user_handlers.you))
-    app.add_handler(CommandHandler("top", user_handlers.top))
-    app.add_handler(CommandHandler("club", user_handlers.club))
+    app.add_handler(CommandHandler("start", timed_handler("start", user_handlers.start)))
+    app.add_handler(CommandHandler("help", timed_handler("help", user_handlers.help_command)))
+    app.add_handler(CommandHandler("register", timed_handler("register", user_handlers.register)))
+    app.add_handler(CommandHandler("navigator", timed_handler("navigator", user_handlers.navigator)))
+    app.add_handler(CommandHandler("me", timed_handler("me", user_handlers.me)))
+    app.add_handler(CommandHandler("you", timed_handler("you", user_handlers.you)))
+    app.add_handler(CommandHandler("top", timed_handler("top", user_handlers.top)))
+    app.add_handler(CommandHandler("club", timed_handler("club", user_handlers.club)))
 
     # Callbacks
-    app.add_handler(CallbackQueryHandler(user_handlers.top_callback, pattern="^top_"))
-    app.add_handler(CallbackQueryHandler(user_handlers.nav_callback, pattern="^nav_"))
+    app.add_handler(CallbackQueryHandler(timed_handler("top_callback", user_handlers.top_callback), pattern="^top_"))
+    app.add_handler(CallbackQueryHandler(timed_handler("nav_callback", user_handlers.nav_callback), pattern="^nav_"))
 
     # Admin
     if os.getenv("ADMIN_USER_ID"):
-        app.add_handler(CommandHandler("ACK", admin_handlers.ack))
-        app.add_handler(CommandHandler("history", admin_handlers.history))
-        app.add_handler(CommandHandler("we", admin_handlers.we))
-        app.add_handler(CallbackQueryHandler(admin_handlers.ack_callback, pattern="^ack_"))
-        app.add_handler(CallbackQueryHandler(admin_handlers.approve_reject_whois, pattern="^(approve_|reject_|whois_)"))
-        app.add_handler(CallbackQueryHandler(admin_handlers.we_callback, pattern="^we_user_"))
-        app.add_handler(CallbackQueryHandler(admin_handlers.we_action, pattern="^we_(norm_|del_)"))
-
-    # Jobs
-    app.job_queue.run_repeating(club_monitor.check_club_changes, interval=300)
-    app.job_queue.run_repeating(player_updater.update_players_cache, interval=300)
-
-    app.run_polling()
+        app.add_handler(CommandHandler("ACK", timed_handler("ACK", admin_handlers.ack)))
+        app.add_handler(CommandHandler("history", timed_handler("history", admin_handlers.history)))
+        app.add_handler(CommandHandler("we", timed_handler("we", admin_handlers.we)))
+        app.add_handler(CommandHandler("export_history", timed_handler("export_history", admin_handlers.export_history)))
+        app.add_handler(CallbackQueryHandler(timed_handler("ack_page", admin_handlers.ack_page), pattern="^ackpg_"))
+        app.add_handler(CallbackQueryHandler(timed_handler("history_page", admin_handlers.history_page), pattern="^histpg_"))
+        app.add_handler(CallbackQueryHandler(timed_handler("we_page", admin_handlers.we_page), pattern="^wepg_"))
+        app.add_handler(CallbackQueryHandler(timed_handler("ack_callback", admin_handlers.ack_callback), pattern="^ack_"))
+        app.add_handler(CallbackQueryHandler(timed_handler("approve_reject_whois", admin_handlers.approve_reject_whois), pattern="^(approve_|reject_|whois_)"))
+        app.add_handler(CallbackQueryHandler(timed_handler("we_callback", admin_handlers.we_callback), pattern="^we_user_"))
+        app.add_handler(CallbackQueryHandler(timed_handler("we_action", admin_handlers.we_action), pattern="^we_(norm_|del_)"))
+
+    # Jobs: запись общего состояния — только на лидере, обновление игроков — на всех репликах по долям
+    # Первые запуски — сразу после старта, а не через целый интервал
+    app.job_queue.run_repeating(coordination.heartbeat, interval=coordination.HEARTBEAT_SECONDS)
+    app.job_queue.run_repeating(
+        coordination.leader_only(club_monitor.check_club_changes), interval=300, first=club_monitor.FIRST_SYNC_DELAY
+    )
+    app.job_queue.run_repeating(refresh_scheduler.refresh_tick, interval=refresh_scheduler.TICK_SECONDS, first=1)
+    app.job_queue.run_repeating(coordination.leader_only(trophy_compactor.compact_trophy_history), interval=3600)
+    app.job_queue.run_repeating(coordination.leader_only(outbox_sender.send_outbox), interval=outbox_sender.OUTBOX_TICK_SECONDS)
+    app.job_queue.run_repeating(coordination.leader_only(history_compactor.compact_club_history), interval=86400)
+    app.job_queue.run_repeating(
+        coordination.leader_only(leaderboard_publisher.publish_leaderboard), interval=leaderboard_publisher.LEADERBOARD_PUBLISH_SECONDS, first=1
+    )
+    app.job_queue.run_repeating(warm_start.save, interval=warm_start.WARM_START_SAVE_SECONDS)
+
+    return app
+
+def main():
+    app = build_app()
+    if BOT_MODE == "webhook":
+        asyncio.run(webhook.serve(app))
+    else:
+        app.run_polling()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,14 @@
+# tests/conftest.py
+import pytest
+from db import async_client
+from bench.fake_mongo import CountingClient
+
+@pytest.fixture
+def mongo():
+    """
+    In-memory Mongo вместо настоящего клиента на время одного теста.
+    """
+    previous = async_client._client
+    async_client._client = CountingClient()
+    yield async_client.get_db()
+    async_client._client = previous
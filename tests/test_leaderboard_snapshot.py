@@ -0,0 +1,31 @@
+# tests/test_leaderboard_snapshot.py
+import asyncio
+import pytest
+from utils import leaderboard_snapshot
+
+@pytest.fixture(autouse=True)
+def snapshot_cache(monkeypatch):
+    monkeypatch.setattr(leaderboard_snapshot, "_snapshots", leaderboard_snapshot.OrderedDict())
+    monkeypatch.setattr(leaderboard_snapshot, "_texts", {})
+    monkeypatch.setattr(leaderboard_snapshot, "_latest_version", None)
+
+def row(tag: str, trophies: int):
+    return {"bs_tag": tag, "name": tag, "trophies": trophies, "progress": 0, "percent": 0, "norm": 100}
+
+def test_latest_without_published_version_does_not_persist(mongo):
+    asyncio.run(mongo.leaderboard.insert_many([row("A", 10), row("B", 20)]))
+
+    snapshot = asyncio.run(leaderboard_snapshot.get())
+
+    assert snapshot["_id"] == leaderboard_snapshot.LIVE_VERSION
+    assert [r["bs_tag"] for r in snapshot["orders"]["trophies"]] == ["B", "A"]
+    assert asyncio.run(mongo.leaderboard_snapshots.count_documents({})) == 0
+
+def test_publish_skips_unchanged_top(mongo):
+    asyncio.run(mongo.leaderboard.insert_many([row("A", 10)]))
+
+    first = asyncio.run(leaderboard_snapshot.publish())
+    second = asyncio.run(leaderboard_snapshot.publish())
+
+    assert first["_id"] == second["_id"]
+    assert asyncio.run(mongo.leaderboard_snapshots.count_documents({})) == 1
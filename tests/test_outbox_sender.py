@@ -0,0 +1,49 @@
+# tests/test_outbox_sender.py
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from jobs import outbox_sender
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        self.sent.append((chat_id, text))
+
+class FakeContext:
+    def __init__(self, bot):
+        self.bot = bot
+
+def message(chat_id: int, text: str):
+    return {
+        "chat_id": chat_id, "text": text, "reply_markup": {"inline_keyboard": [[{"text": "ok", "callback_data": "x"}]]},
+        "status": "pending", "attempts": 0, "not_before": datetime(2000, 1, 1, tzinfo=timezone.utc)
+    }
+
+@pytest.fixture(autouse=True)
+def sender_state(monkeypatch):
+    monkeypatch.setattr(outbox_sender, "_last_sent", {})
+    monkeypatch.setattr(outbox_sender, "_paused_until", 0.0)
+    monkeypatch.setattr(outbox_sender, "_carry", 0.0)
+
+def test_long_queue_of_one_chat_does_not_block_others(mongo):
+    # Очередь первого чата длиннее OUTBOX_BATCH и поставлена раньше, второй чат всё равно обслуживается
+    backlog = [message(1, f"m{i}") for i in range(outbox_sender.OUTBOX_BATCH + 50)]
+    asyncio.run(mongo.outbox.insert_many(backlog + [message(2, "hello")]))
+    bot = FakeBot()
+
+    asyncio.run(outbox_sender.send_outbox(FakeContext(bot)))
+
+    assert [chat_id for chat_id, _ in bot.sent] == [1, 2]
+    assert asyncio.run(mongo.outbox.count_documents({"chat_id": 2, "status": "sent"})) == 1
+
+def test_chat_in_interval_is_skipped_by_query(mongo):
+    asyncio.run(mongo.outbox.insert_many([message(1, "a"), message(1, "b"), message(2, "c")]))
+    bot = FakeBot()
+
+    asyncio.run(outbox_sender.send_outbox(FakeContext(bot)))
+    asyncio.run(outbox_sender.send_outbox(FakeContext(bot)))
+
+    # Второй тик в пределах OUTBOX_CHAT_INTERVAL: оба чата уже получили сообщение
+    assert [chat_id for chat_id, _ in bot.sent] == [1, 2]
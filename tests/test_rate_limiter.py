@@ -0,0 +1,8 @@
+# tests/test_rate_limiter.py
+import pytest
+from api.rate_limiter import RateLimiter
+
+@pytest.mark.parametrize("rate, burst", [(0, 10), (-1, 10), (5, 0)])
+def test_invalid_settings_fail_fast(rate, burst):
+    with pytest.raises(ValueError):
+        RateLimiter(rate, burst)
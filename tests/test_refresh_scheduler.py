@@ -0,0 +1,32 @@
+# tests/test_refresh_scheduler.py
+import asyncio
+import time
+from datetime import datetime, timezone
+import pytest
+from jobs import refresh_scheduler
+from utils import coordination
+
+@pytest.fixture(autouse=True)
+def scheduler_state(monkeypatch):
+    monkeypatch.setattr(refresh_scheduler, "_players", {})
+    monkeypatch.setattr(refresh_scheduler, "_roster_loaded_at", 0.0)
+    monkeypatch.setattr(refresh_scheduler, "_partition", None)
+
+def test_view_on_other_replica_reaches_owner(mongo, monkeypatch):
+    asyncio.run(mongo.users.insert_one({"tg_id": 1, "bs_tag": "A", "status": "approved"}))
+    # Игрок только что обновлён — без просмотра его очередь подошла бы не раньше MIN_INTERVAL
+    asyncio.run(mongo.leaderboard.insert_one({"bs_tag": "A", "updated_at": datetime.now(timezone.utc)}))
+
+    # Реплика, которой игрок не принадлежит: в её планировщике его нет, отметка уходит в БД
+    monkeypatch.setattr(coordination, "owns", lambda tag: False)
+    asyncio.run(refresh_scheduler.reload_roster(time.time()))
+    asyncio.run(refresh_scheduler.mark_viewed("A"))
+    assert "A" not in refresh_scheduler._players
+
+    # Реплика-владелец подхватывает просмотр при перечитывании списка
+    monkeypatch.setattr(coordination, "owns", lambda tag: True)
+    now = time.time()
+    asyncio.run(refresh_scheduler.reload_roster(now))
+    state = refresh_scheduler._players["A"]
+    assert state.viewed_at is not None
+    assert state.next_due <= now + refresh_scheduler.VIEW_REFRESH_DELAY
@@ -0,0 +1,55 @@
+# tests/test_roster.py
+import asyncio
+import pytest
+from utils import roster, clubs
+from utils.roster import Membership
+
+@pytest.fixture
+def live_roster(monkeypatch):
+    """
+    Снимок состава свежий, но без недавно вступивших; живой запрос к API возвращает members.
+    """
+    members = {"OLD"}
+    calls = []
+
+    async def fetch_live(tag):
+        calls.append(tag)
+        await asyncio.sleep(0.01)
+        return [{"tag": "#" + t} for t in sorted(members)]
+
+    async def active_tags():
+        return ["CLUB"]
+
+    monkeypatch.setattr(roster, "fetch_club_members_live", fetch_live)
+    monkeypatch.setattr(clubs, "active_tags", active_tags)
+    monkeypatch.setattr(roster, "_live_task", None)
+    monkeypatch.setattr(roster, "_live_at", 0.0)
+    monkeypatch.setattr(roster, "_live_ok", True)
+    monkeypatch.setattr(roster, "_tags", None)
+    monkeypatch.setattr(roster, "_synced_at", 0.0)
+    roster.update_snapshot(["OLD"])
+    return members, calls
+
+def test_joined_after_last_sync_is_member(live_roster):
+    members, calls = live_roster
+    members.add("NEW")
+
+    assert asyncio.run(roster.check_membership("NEW")) is Membership.MEMBER
+    assert calls == ["CLUB"]
+
+def test_live_check_is_single_flight_and_rate_limited(live_roster):
+    members, calls = live_roster
+
+    async def burst():
+        return await asyncio.gather(*(roster.check_membership(f"X{i}") for i in range(5)))
+
+    assert asyncio.run(burst()) == [Membership.NOT_MEMBER] * 5
+    assert asyncio.run(roster.check_membership("Y")) is Membership.NOT_MEMBER
+    assert calls == ["CLUB"]
+
+def test_failed_live_check_is_unknown(live_roster, monkeypatch):
+    async def fetch_live(tag):
+        raise RuntimeError("API down")
+
+    monkeypatch.setattr(roster, "fetch_club_members_live", fetch_live)
+    assert asyncio.run(roster.check_membership("NEW")) is Membership.UNKNOWN
@@ -0,0 +1,93 @@
+# utils/assets.py
+import os
+import asyncio
+import hashlib
+import logging
+from telegram.error import BadRequest
+from db import assets_repo
+
+ASSETS_DIR = "assets"
+
+# name -> (mtime, size, sha256): хэш пересчитывается только если файл изменился
+_hashes = {}
+# sha256 -> file_id, который Telegram вернул после первой загрузки
+_file_ids = {}
+# sha256 -> Future с file_id идущей загрузки: одновременные первые отправки ждут её, а не грузят файл сами
+_uploads = {}
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+async def asset_hash(name: str):
+    """
+    Возвращает (путь, sha256) картинки из assets или None, если файла нет.
+    """
+    path = os.path.join(ASSETS_DIR, name)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    cached = _hashes.get(name)
+    if cached and cached[0] == st.st_mtime and cached[1] == st.st_size:
+        return path, cached[2]
+    content_hash = await asyncio.to_thread(_sha256, path)
+    _hashes[name] = (st.st_mtime, st.st_size, content_hash)
+    return path, content_hash
+
+async def get_file_id(content_hash: str):
+    file_id = _file_ids.get(content_hash)
+    if file_id is None:
+        file_id = await assets_repo.get_file_id(content_hash)
+        if file_id:
+            _file_ids[content_hash] = file_id
+    return file_id
+
+async def send_photo(message, name: str, caption: str) -> bool:
+    """
+    Отправляет картинку из assets: повторно использует file_id, загружает файл не больше одного раза.
+    Возвращает False, если файла нет.
+    """
+    asset = await asset_hash(name)
+    if asset is None:
+        return False
+    path, content_hash = asset
+
+    file_id = await get_file_id(content_hash)
+    if file_id:
+        try:
+            await message.reply_photo(photo=file_id, caption=caption)
+            return True
+        except BadRequest as e:
+            # file_id мог стать недействительным (например, сменили бота) — загружаем заново
+            logging.warning(f"⚠️ file_id для {name} не принят: {e}")
+            _file_ids.pop(content_hash, None)
+            await assets_repo.forget(content_hash)
+
+    upload = _uploads.get(content_hash)
+    if upload is not None:
+        file_id = await asyncio.shield(upload)
+        if file_id:
+            await message.reply_photo(photo=file_id, caption=caption)
+            return True
+        # Загрузка не удалась — пробуем сами
+
+    upload = asyncio.get_running_loop().create_future()
+    _uploads[content_hash] = upload
+    file_id = None
+    try:
+        with open(path, "rb") as f:
+            sent = await message.reply_photo(photo=f, caption=caption)
+        if sent.photo:
+            file_id = sent.photo[-1].file_id
+            _file_ids[content_hash] = file_id
+    finally:
+        upload.set_result(file_id)
+        if _uploads.get(content_hash) is upload:
+            del _uploads[content_hash]
+    if file_id:
+        await assets_repo.save_file_id(content_hash, name, file_id)
+    return True
@@ -0,0 +1,19 @@
+# utils/club_stats.py
+from datetime import datetime, timezone
+from db import leaderboard_repo, club_stats_repo
+
+async def recompute():
+    """
+    Пересчитывает сводку клуба по рейтингу и сохраняет её до следующей публикации топа.
+    """
+    stats = await leaderboard_repo.summary()
+    stats["done_percent"] = round(stats["done"] / stats["members"] * 100) if stats["members"] else 0
+    stats["computed_at"] = datetime.now(timezone.utc)
+    await club_stats_repo.save(stats)
+    return stats
+
+async def get_stats():
+    stats = await club_stats_repo.get()
+    if stats is None:
+        stats = await recompute()
+    return stats
@@ -0,0 +1,51 @@
+# utils/clubs.py
+import os
+import time
+import asyncio
+import logging
+from db import clubs_repo, club_repo
+
+# Основной клуб и клубы-филиалы: CLUB_TAGS="MAIN,FEEDER1,FEEDER2" (или один CLUB_TAG)
+CLUB_TAGS = [
+    t.strip().lstrip("#").upper()
+    for t in (os.getenv("CLUB_TAGS") or os.getenv("CLUB_TAG") or "").split(",")
+    if t.strip()
+]
+MAIN_CLUB_TAG = CLUB_TAGS[0] if CLUB_TAGS else None
+# Реестр клубов меняется вручную и редко — держим его в памяти процесса
+CLUBS_CACHE_TTL = float(os.getenv("CLUBS_CACHE_TTL", "300"))
+
+_tags = None
+_cached_at = 0.0
+_load_lock = asyncio.Lock()
+
+async def seed():
+    """
+    Заносит клубы из окружения в реестр и один раз привязывает к основному клубу
+    записи, созданные до появления нескольких клубов.
+    """
+    await clubs_repo.seed(CLUB_TAGS, MAIN_CLUB_TAG)
+    if MAIN_CLUB_TAG:
+        await club_repo.assign_unscoped(MAIN_CLUB_TAG)
+    invalidate()
+    logging.info(f"✅ Клубы в реестре: {', '.join('#' + t for t in CLUB_TAGS) or '—'}")
+
+def invalidate():
+    global _tags
+    _tags = None
+
+async def active_tags() -> list:
+    """
+    Теги всех включённых клубов; основной — первым.
+    """
+    global _tags, _cached_at
+    if _tags is not None and time.monotonic() - _cached_at < CLUBS_CACHE_TTL:
+        return _tags
+    async with _load_lock:
+        if _tags is not None and time.monotonic() - _cached_at < CLUBS_CACHE_TTL:
+            return _tags
+        docs = await clubs_repo.list_active()
+        tags = [d["_id"] for d in docs]
+        _tags = sorted(tags, key=lambda t: t != MAIN_CLUB_TAG)
+        _cached_at = time.monotonic()
+        return _tags
@@ -0,0 +1,109 @@
+# utils/coordination.py
+"""
+Координация нескольких реплик бота через MongoDB.
+
+Аренда (lease) с фенсинг-токеном выбирает одного лидера, который выполняет
+задачи с записью общего состояния (синхронизация клубов, сжатие истории).
+Обновление игроков делится между живыми репликами по crc32(bs_tag).
+"""
+import os
+import time
+import uuid
+import zlib
+import socket
+import logging
+import functools
+from datetime import datetime, timezone, timedelta
+from db import leases_repo, replicas_repo
+from utils.metrics import LEADER, LIVE_REPLICAS
+
+REPLICA_ID = os.getenv("REPLICA_ID") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+LEASE_NAME = "jobs"
+# Срок аренды и период продления (сек); реплика без пульса дольше REPLICA_TTL считается мёртвой
+LEASE_TTL = float(os.getenv("LEASE_TTL", "30"))
+HEARTBEAT_SECONDS = float(os.getenv("HEARTBEAT_SECONDS", "10"))
+REPLICA_TTL = float(os.getenv("REPLICA_TTL", str(3 * HEARTBEAT_SECONDS)))
+
+_token = None           # фенсинг-токен, пока мы лидер
+_leader_until = 0.0     # time.monotonic(), после которого лидерство без продления не считается действительным
+_replicas = [REPLICA_ID]
+
+async def heartbeat(context):
+    """
+    Периодически: продлевает/захватывает аренду, отмечает реплику живой и перечитывает список реплик.
+    """
+    global _token, _leader_until, _replicas
+    now = datetime.now(timezone.utc)
+    started = time.monotonic()
+    try:
+        lease = await leases_repo.acquire(LEASE_NAME, REPLICA_ID, LEASE_TTL, now)
+        if lease is not None:
+            if _token != lease["token"]:
+                logging.info(f"👑 Реплика {REPLICA_ID} стала лидером (токен {lease['token']}).")
+            _token = lease["token"]
+            # Запас на задержку запроса: локально аренда истекает раньше, чем в БД
+            _leader_until = started + LEASE_TTL - HEARTBEAT_SECONDS
+        elif _token is not None:
+            logging.warning(f"⚠️ Реплика {REPLICA_ID} потеряла лидерство.")
+            _token = None
+
+        await replicas_repo.heartbeat(REPLICA_ID, now)
+        live = await replicas_repo.live_ids(now - timedelta(seconds=REPLICA_TTL))
+        if REPLICA_ID not in live:
+            live = sorted(live + [REPLICA_ID])
+        if live != _replicas:
+            logging.info(f"🧩 Живые реплики: {len(live)}.")
+        _replicas = live
+    except Exception as e:
+        logging.error(f"❌ Ошибка пульса реплики: {e}")
+    LEADER.set(1 if is_leader() else 0)
+    LIVE_REPLICAS.set(len(_replicas))
+
+def is_leader() -> bool:
+    return _token is not None and time.monotonic() < _leader_until
+
+async def check_fencing() -> bool:
+    """
+    Проверяет в БД, что аренда всё ещё наша и токен не сменился. Вызывать перед записью.
+    """
+    if not is_leader():
+        return False
+    return await leases_repo.is_held(LEASE_NAME, REPLICA_ID, _token, datetime.now(timezone.utc))
+
+def leader_only(job):
+    """
+    Оборачивает задачу JobQueue: выполняется только на реплике-лидере.
+    """
+    @functools.wraps(job)
+    async def wrapper(context):
+        if not is_leader():
+            return
+        return await job(context)
+    return wrapper
+
+def partition():
+    """
+    (номер этой реплики, число живых реплик).
+    """
+    return _replicas.index(REPLICA_ID), len(_replicas)
+
+def owns(bs_tag: str) -> bool:
+    """
+    Отвечает ли эта реплика за обновление игрока.
+    """
+    index, count = partition()
+    return zlib.crc32(bs_tag.encode()) % count == index
+
+async def resign():
+    """
+    При остановке: отдаёт аренду и убирает реплику, чтобы остальные подхватили работу сразу.
+    """
+    global _token
+    try:
+        now = datetime.now(timezone.utc)
+        if _token is not None:
+            await leases_repo.release(LEASE_NAME, REPLICA_ID, now)
+        await replicas_repo.remove(REPLICA_ID)
+    except Exception as e:
+        logging.error(f"❌ Не удалось снять аренду: {e}")
+    _token = None
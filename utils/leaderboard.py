@@ -0,0 +1,63 @@
+# utils/leaderboard.py
+from datetime import datetime, timezone
+from db import leaderboard_repo, users_repo, players_repo
+from utils.season import get_season_config
+from utils import trophy_history
+
+def norm_percent(progress: int, norm: int) -> int:
+    return max(0, min(100, round(progress / norm * 100))) if norm > 0 else 0
+
+def build_row(user: dict, trophies: int, name: str, base_norm: int, season_start: int = None) -> dict:
+    """
+    Строка рейтинга: трофеи, прогресс за сезон и процент нормы уже посчитаны.
+    """
+    norm = user.get("custom_norm", base_norm)
+    if season_start is None:
+        season_start = trophies
+    progress = trophies - season_start
+    return {
+        "bs_tag": user["bs_tag"],
+        "tg_id": user.get("tg_id"),
+        "name": name,
+        "trophies": trophies,
+        "season_start": season_start,
+        "norm": norm,
+        "progress": progress,
+        "percent": norm_percent(progress, norm),
+        "updated_at": datetime.now(timezone.utc)
+    }
+
+async def refresh(users, fetched: dict):
+    """
+    Инкрементально обновляет рейтинг по свежим данным игроков {tag: player_data}.
+    users — подтверждённые пользователи (нужны bs_tag, tg_id, custom_norm).
+    """
+    config = await get_season_config()
+    starts = await trophy_history.season_start_values(fetched.keys())
+    rows = [
+        build_row(
+            u, fetched[u["bs_tag"]]["trophies"], fetched[u["bs_tag"]]["name"],
+            config["base_norm"], starts.get(u["bs_tag"])
+        )
+        for u in users if u["bs_tag"] in fetched
+    ]
+    await leaderboard_repo.upsert_rows(rows)
+    return rows
+
+async def add_user(tg_id: int):
+    """
+    Добавляет только что подтверждённого пользователя, если его данные уже есть в кэше.
+    """
+    user = await users_repo.find_by_tg_id(tg_id)
+    if not user or user.get("status") != "approved":
+        return
+    cache = await players_repo.find_by_tag(user["bs_tag"])
+    if not cache:
+        return
+    config = await get_season_config()
+    start = await trophy_history.season_start_value(user["bs_tag"])
+    await leaderboard_repo.upsert_rows([build_row(user, cache["trophies"], cache["name"], config["base_norm"], start)])
+
+async def remove(bs_tags):
+    if bs_tags:
+        await leaderboard_repo.delete_by_tags(bs_tags)
@@ -0,0 +1,106 @@
+# utils/leaderboard_snapshot.py
+"""
+Неизменяемые версии топа: лидер раз в LEADERBOARD_PUBLISH_SECONDS снимает отсортированные
+порядки и публикует новую версию, только если топ изменился. Кнопки /top несут версию, текст кэшируется по (версия, порядок).
+"""
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from db import leaderboard_repo, leaderboard_snapshots_repo
+
+TOP_SIZE = int(os.getenv("TOP_SIZE", "10"))
+# Сколько хранить старые версии (сек) — столько работают кнопки старых сообщений
+SNAPSHOT_KEEP_SECONDS = float(os.getenv("LEADERBOARD_SNAPSHOT_KEEP", "3600"))
+# Как часто перечитывать номер последней версии (сек)
+LATEST_TTL = float(os.getenv("LEADERBOARD_LATEST_TTL", "5"))
+SNAPSHOT_CACHE_SIZE = 16
+# Только поля, которые показывает /top: без updated_at снимки сравниваются по содержимому
+SNAPSHOT_FIELDS = {"_id": 0, "bs_tag": 1, "name": 1, "trophies": 1, "progress": 1, "percent": 1}
+# Версия живого топа, который ещё не опубликован: не хранится и не кэшируется
+LIVE_VERSION = 0
+
+_snapshots = OrderedDict()  # версия -> снимок
+_texts = {}                 # (версия, порядок) -> готовый текст
+_latest_version = None
+_latest_loaded_at = 0.0
+
+def remember(snapshot: dict):
+    version = snapshot["_id"]
+    _snapshots[version] = snapshot
+    _snapshots.move_to_end(version)
+    while len(_snapshots) > SNAPSHOT_CACHE_SIZE:
+        old, _ = _snapshots.popitem(last=False)
+        for order in leaderboard_repo.ORDERS:
+            _texts.pop((old, order), None)
+    return snapshot
+
+def current():
+    return _snapshots.get(_latest_version)
+
+def prime(snapshot: dict):
+    """
+    Кладёт в кэш снимок из файла тёплого старта; он считается последним до проверки LATEST_TTL.
+    """
+    global _latest_version, _latest_loaded_at
+    _latest_version, _latest_loaded_at = snapshot["_id"], time.monotonic()
+    remember(snapshot)
+
+async def _top_orders():
+    return {order: await leaderboard_repo.top(order, TOP_SIZE, SNAPSHOT_FIELDS) for order in leaderboard_repo.ORDERS}
+
+async def publish():
+    """
+    Снимает текущий топ по всем порядкам и публикует как новую версию.
+    Если топ не изменился с последней версии, возвращает её без записи.
+    Вызывается только из leaderboard_publisher на лидере.
+    """
+    global _latest_version, _latest_loaded_at
+    orders = await _top_orders()
+    previous = await leaderboard_snapshots_repo.latest()
+    if previous and previous["orders"] == orders:
+        _latest_version, _latest_loaded_at = previous["_id"], time.monotonic()
+        return remember(previous)
+
+    now = datetime.now(timezone.utc)
+    version = int(now.timestamp() * 1000)
+    snapshot = {"_id": version, "created_at": now, "orders": orders}
+    await leaderboard_snapshots_repo.insert(snapshot)
+    await leaderboard_snapshots_repo.delete_older_than(version - int(SNAPSHOT_KEEP_SECONDS * 1000))
+    _latest_version, _latest_loaded_at = version, time.monotonic()
+    return remember(snapshot)
+
+async def latest():
+    """
+    Последняя опубликованная версия. Пока лидер не опубликовал ни одной — живой топ без сохранения.
+    """
+    global _latest_version, _latest_loaded_at
+    if _latest_version in _snapshots and time.monotonic() - _latest_loaded_at < LATEST_TTL:
+        return _snapshots[_latest_version]
+    snapshot = await leaderboard_snapshots_repo.latest()
+    if snapshot is None:
+        return {"_id": LIVE_VERSION, "created_at": datetime.now(timezone.utc), "orders": await _top_orders()}
+    _latest_version, _latest_loaded_at = snapshot["_id"], time.monotonic()
+    return remember(snapshot)
+
+async def get(version: int = None):
+    """
+    Снимок нужной версии; если она уже удалена (или не указана) — последний.
+    """
+    if not version:
+        return await latest()
+    if version in _snapshots:
+        return _snapshots[version]
+    snapshot = await leaderboard_snapshots_repo.get(version)
+    return remember(snapshot) if snapshot else await latest()
+
+def text(snapshot: dict, order: str, render) -> str:
+    """
+    Текст топа для версии и порядка: render(rows, order) вызывается один раз.
+    """
+    if snapshot["_id"] == LIVE_VERSION:
+        return render(snapshot["orders"][order], order)
+    key = (snapshot["_id"], order)
+    if key not in _texts:
+        _texts[key] = render(snapshot["orders"][order], order)
+    return _texts[key]
@@ -0,0 +1,107 @@
+# utils/metrics.py
+import os
+import re
+import time
+import logging
+import functools
+from pymongo import monitoring
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+# Порт /metrics в формате Prometheus (0 — не запускать)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+METRICS_ADDR = os.getenv("METRICS_ADDR", "127.0.0.1")
+
+HANDLER_LATENCY = Histogram(
+    "bot_handler_latency_seconds", "Время обработки команды/колбэка", ["handler"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Исключения в хендлерах", ["handler"])
+
+API_REQUESTS = Counter("brawl_api_requests_total", "Запросы к Brawl Stars API", ["endpoint", "status"])
+API_LATENCY = Histogram(
+    "brawl_api_request_seconds", "Время запроса к Brawl Stars API", ["endpoint"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+MONGO_LATENCY = Histogram(
+    "mongo_operation_seconds", "Время операции MongoDB", ["collection", "command"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+MONGO_FAILURES = Counter("mongo_operation_failures_total", "Ошибки операций MongoDB", ["collection", "command"])
+
+JOB_DURATION = Histogram(
+    "job_cycle_seconds", "Длительность цикла фоновой задачи", ["job"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+JOB_PLAYERS = Counter("job_players_total", "Игроки, обработанные задачами", ["job", "result"])
+JOB_LAST_CYCLE_PLAYERS = Gauge("job_last_cycle_players", "Игроки в последнем цикле задачи", ["job", "result"])
+
+LEADER = Gauge("bot_leader", "1, если реплика держит аренду лидера")
+LIVE_REPLICAS = Gauge("bot_live_replicas", "Живые реплики бота")
+
+def timed_handler(name: str, callback):
+    """
+    Оборачивает хендлер PTB: гистограмма задержки и счётчик исключений.
+    """
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except Exception:
+            HANDLER_ERRORS.labels(name).inc()
+            raise
+        finally:
+            HANDLER_LATENCY.labels(name).observe(time.perf_counter() - started)
+    return wrapper
+
+def api_endpoint(path: str) -> str:
+    # Тег игрока в метку не попадает — иначе кардинальность = размер клуба
+    if path.startswith("/players/"):
+        return "players"
+    if re.match(r"^/clubs/[^/]+/members", path):
+        return "club_members"
+    return "other"
+
+def observe_api(path: str, status, seconds: float):
+    endpoint = api_endpoint(path)
+    API_REQUESTS.labels(endpoint, str(status)).inc()
+    API_LATENCY.labels(endpoint).observe(seconds)
+
+def observe_job(job: str, seconds: float, refreshed: int = None, failed: int = None):
+    JOB_DURATION.labels(job).observe(seconds)
+    for result, value in (("refreshed", refreshed), ("failed", failed)):
+        if value is not None:
+            JOB_PLAYERS.labels(job, result).inc(value)
+            JOB_LAST_CYCLE_PLAYERS.labels(job, result).set(value)
+
+class MongoMetricsListener(monitoring.CommandListener):
+    """
+    Время каждой команды MongoDB по коллекции (подключается через event_listeners клиента).
+    """
+
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event):
+        collection = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        if not isinstance(collection, str):
+            collection = "-"
+        self._pending[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event):
+        collection = self._pending.pop((event.connection_id, event.request_id), "-")
+        MONGO_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        return collection
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        MONGO_FAILURES.labels(collection, event.command_name).inc()
+
+def start_metrics_server():
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT, addr=METRICS_ADDR)
+        logging.info(f"📈 Метрики: http://{METRICS_ADDR}:{METRICS_PORT}/metrics")
@@ -0,0 +1,35 @@
+# utils/notify.py
+"""
+Исходящие сообщения через очередь (коллекция outbox): отправляет их jobs.outbox_sender
+с учётом лимитов Telegram. Сообщения без кнопок в один чат склеиваются.
+"""
+import os
+from datetime import datetime, timezone
+from db import outbox_repo
+
+ADMIN_ID = int(os.getenv("ADMIN_USER_ID")) if os.getenv("ADMIN_USER_ID") else None
+
+def message(chat_id: int, text: str, reply_markup=None) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "chat_id": chat_id,
+        "text": text,
+        "reply_markup": reply_markup.to_dict() if reply_markup is not None else None,
+        "status": "pending",
+        "attempts": 0,
+        "not_before": now,
+        "created_at": now,
+    }
+
+async def send(chat_id: int, text: str, reply_markup=None):
+    await outbox_repo.enqueue([message(chat_id, text, reply_markup)])
+
+async def send_many(messages):
+    """
+    messages — [(chat_id, text)]; одна запись в БД на всю пачку.
+    """
+    await outbox_repo.enqueue([message(chat_id, text) for chat_id, text in messages])
+
+async def notify_admin(text: str, reply_markup=None):
+    if ADMIN_ID:
+        await send(ADMIN_ID, text, reply_markup)
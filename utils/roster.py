@@ -0,0 +1,108 @@
+# utils/roster.py
+import os
+import time
+import asyncio
+import logging
+from enum import Enum
+from api.brawl_api import fetch_club_members, fetch_club_members_live
+from db import club_repo
+from utils import clubs
+
+# Снимок состава старше этого (сек) считается устаревшим; club_monitor обновляет его каждые 5 минут
+ROSTER_MAX_AGE = float(os.getenv("ROSTER_MAX_AGE", "900"))
+# Живая перепроверка состава для «не состоит» — не чаще раза в столько секунд на процесс
+ROSTER_LIVE_INTERVAL = float(os.getenv("ROSTER_LIVE_INTERVAL", "30"))
+
+class Membership(Enum):
+    MEMBER = "member"
+    NOT_MEMBER = "not_member"
+    UNKNOWN = "unknown"
+
+_tags = None          # frozenset тегов текущего состава всех клубов
+_synced_at = 0.0      # time.time() последней синхронизации снимка
+_refresh_task = None  # общий запрос на обновление (single-flight)
+_live_task = None     # общая живая перепроверка состава (single-flight)
+_live_at = 0.0        # time.monotonic() начала последней живой перепроверки
+_live_ok = True       # удалась ли последняя живая перепроверка
+
+def update_snapshot(tags, synced_at: float = None):
+    """
+    Заменяет снимок состава. Вызывается club_monitor после каждой синхронизации.
+    """
+    global _tags, _synced_at
+    _tags = frozenset(tags)
+    _synced_at = synced_at if synced_at is not None else time.time()
+
+def snapshot():
+    """
+    (теги, время синхронизации) для снимка тёплого старта; None, если состав ещё не загружен.
+    """
+    return (sorted(_tags), _synced_at) if _tags is not None else None
+
+def is_fresh() -> bool:
+    return _tags is not None and time.time() - _synced_at < ROSTER_MAX_AGE
+
+async def _refresh():
+    club_tags = await clubs.active_tags()
+    # 1) снимок в БД мог обновить club_monitor (в т.ч. другой реплики)
+    synced_at = await club_repo.get_synced_at(club_tags)
+    if synced_at and time.time() - synced_at.timestamp() < ROSTER_MAX_AGE:
+        docs = await club_repo.list_members(club_tags, {"bs_tag": 1})
+        update_snapshot((d["bs_tag"] for d in docs), synced_at.timestamp())
+        return
+    # 2) иначе — по одному живому запросу к API на клуб
+    rosters = await asyncio.gather(*(fetch_club_members(tag) for tag in club_tags))
+    update_snapshot(m["tag"][1:] for members in rosters for m in members)
+
+async def ensure_fresh() -> bool:
+    """
+    Обновляет устаревший снимок; параллельные вызовы ждут один и тот же запрос.
+    """
+    global _refresh_task
+    if is_fresh():
+        return True
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.ensure_future(_refresh())
+    try:
+        await asyncio.shield(_refresh_task)
+    except Exception as e:
+        logging.error(f"❌ Не удалось обновить состав клуба: {e}")
+    return is_fresh()
+
+async def _fetch_live():
+    club_tags = await clubs.active_tags()
+    rosters = await asyncio.gather(*(fetch_club_members_live(tag) for tag in club_tags))
+    update_snapshot(m["tag"][1:] for members in rosters for m in members)
+
+async def ensure_live() -> bool:
+    """
+    Перечитывает состав из API: параллельные вызовы ждут один запрос, а новый запрос
+    начинается не чаще раза в ROSTER_LIVE_INTERVAL (до этого снимок и так свежий).
+    False — перепроверка не удалась.
+    """
+    global _live_task, _live_at, _live_ok
+    if _live_task is None or _live_task.done():
+        if time.monotonic() - _live_at < ROSTER_LIVE_INTERVAL:
+            return _live_ok
+        _live_at = time.monotonic()
+        _live_task = asyncio.ensure_future(_fetch_live())
+    try:
+        await asyncio.shield(_live_task)
+        _live_ok = True
+    except Exception as e:
+        logging.error(f"❌ Не удалось перепроверить состав клуба: {e}")
+        _live_ok = False
+    return _live_ok
+
+async def check_membership(bs_tag: str) -> Membership:
+    """
+    Состоит ли игрок в одном из клубов. UNKNOWN — проверить не удалось (API недоступен, лимит запросов).
+    Отсутствие в снимке перепроверяется живым запросом: игрок мог вступить после последней синхронизации.
+    """
+    if not await ensure_fresh():
+        return Membership.UNKNOWN
+    if bs_tag in _tags:
+        return Membership.MEMBER
+    if not await ensure_live():
+        return Membership.UNKNOWN
+    return Membership.MEMBER if bs_tag in _tags else Membership.NOT_MEMBER
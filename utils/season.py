@@ -1,26 +1,77 @@
 # utils/season.py
-from datetime import datetime, timezone
-from db.mongo_client import db
 import os
+import time
+import asyncio
+from datetime import datetime, timezone
+from db import season_repo
+
+# Конфиг сезона меняется редко (вручную в БД, команды для этого нет) — держим его в памяти процесса;
+# правка подхватывается за SEASON_CACHE_TTL, строки рейтинга — при следующем обновлении игрока
+SEASON_CACHE_TTL = float(os.getenv("SEASON_CACHE_TTL", "300"))
+
+_cached_config = None
+_cached_at = 0.0
+_load_lock = asyncio.Lock()
+
+def default_season_config():
+    return {
+        "_id": "current",
+        "start_date": datetime(2025, 12, 1, tzinfo=timezone.utc),
+        "end_date": datetime(2026, 1, 15, 23, 59, 59, tzinfo=timezone.utc),
+        "base_norm": int(os.getenv("NORM", "3000"))
+    }
 
-def get_season_config():
-    config = db.season_config.find_one({"_id": "current"})
-    if not config:
-        config = {
-            "_id": "current",
-            "start_date": datetime(2025, 12, 1, tzinfo=timezone.utc),
-            "end_date": datetime(2026, 1, 15, 23, 59, 59, tzinfo=timezone.utc),
-            "base_norm": int(os.getenv("NORM", "3000"))
-        }
-        db.season_config.insert_one(config)
+def as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+def prepare_config(config: dict) -> dict:
+    """
+    Нормализует даты и заранее считает дедлайн конца сезона.
+    """
+    config = dict(config)
+    config["start_date"] = as_utc(config["start_date"])
+    config["end_date"] = as_utc(config["end_date"])
+    config["end_ts"] = config["end_date"].timestamp()
     return config
 
-def days_until_end():
-    config = get_season_config()
-    now = datetime.now(timezone.utc)
-    if now > config["end_date"]:
+def invalidate_season_config():
+    """
+    Сбрасывает кэш: следующий запрос перечитает конфиг из БД.
+    """
+    global _cached_config
+    _cached_config = None
+
+def cached_config():
+    return _cached_config
+
+def prime(config: dict):
+    """
+    Кладёт в кэш конфиг из снимка тёплого старта.
+    """
+    global _cached_config, _cached_at
+    _cached_config = prepare_config(config)
+    _cached_at = time.monotonic()
+
+async def get_season_config():
+    global _cached_config, _cached_at
+    if _cached_config is not None and time.monotonic() - _cached_at < SEASON_CACHE_TTL:
+        return _cached_config
+    async with _load_lock:
+        # Пока ждали блокировку, конфиг мог загрузить другой запрос
+        if _cached_config is not None and time.monotonic() - _cached_at < SEASON_CACHE_TTL:
+            return _cached_config
+        config = await season_repo.get_current()
+        if not config:
+            config = await season_repo.get_or_create(default_season_config())
+        _cached_config = prepare_config(config)
+        _cached_at = time.monotonic()
+        return _cached_config
+
+async def days_until_end():
+    config = await get_season_config()
+    remaining = config["end_ts"] - time.time()
+    if remaining <= 0:
         return 0, 0
-    delta = config["end_date"] - now
-    days = delta.days
-    hours = int(delta.total_seconds() // 3600)
-    return days, hours
\ No newline at end of file
+    days = int(remaining // 86400)
+    hours = int(remaining // 3600)
+    return days, hours
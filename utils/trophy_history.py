@@ -0,0 +1,37 @@
+# utils/trophy_history.py
+from datetime import datetime, timezone, timedelta
+from db import trophy_history_repo
+from utils.season import get_season_config
+
+async def record(fetched: dict):
+    """
+    Пишет точки для игроков, у которых трофеи изменились (или которых ещё нет в истории).
+    fetched — {tag: player_data}.
+    """
+    now = datetime.now(timezone.utc)
+    previous = await trophy_history_repo.latest_values(fetched.keys())
+    points = [
+        {"bs_tag": tag, "ts": now, "trophies": data["trophies"], "res": "raw"}
+        for tag, data in fetched.items()
+        if previous.get(tag) != data["trophies"]
+    ]
+    await trophy_history_repo.insert_points(points)
+    return len(points)
+
+async def season_start_values(bs_tags):
+    """
+    {tag: трофеи на начало текущего сезона}.
+    """
+    config = await get_season_config()
+    return await trophy_history_repo.values_at(bs_tags, config["start_date"])
+
+async def season_start_value(bs_tag: str):
+    config = await get_season_config()
+    return await trophy_history_repo.value_at(bs_tag, config["start_date"])
+
+async def gain_since(bs_tag: str, current: int, period: timedelta):
+    """
+    Прирост трофеев за период (например, за последние 24 часа).
+    """
+    before = await trophy_history_repo.value_at(bs_tag, datetime.now(timezone.utc) - period)
+    return current - before if before is not None else 0
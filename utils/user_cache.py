@@ -0,0 +1,81 @@
+# utils/user_cache.py
+import os
+import time
+from collections import OrderedDict
+from db import users_repo, cache_epochs_repo
+
+# Ограниченный LRU-кэш пользователей по tg_id: и проверка доступа, и профиль берутся отсюда
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "5000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+# Как часто сверять эпоху кэша в Mongo: инвалидация на одной реплике сбрасывает кэш на остальных
+USER_EPOCH_CHECK = float(os.getenv("USER_EPOCH_CHECK", "1"))
+EPOCH_NAME = "users"
+
+_cache = OrderedDict()  # tg_id -> (loaded_at, user или None)
+_tag_index = {}         # bs_tag -> tg_id, для инвалидации по тегу
+_epoch = None           # последняя известная эпоха кэша в Mongo
+_epoch_checked_at = 0.0
+
+def _store(tg_id: int, user):
+    _cache[tg_id] = (time.monotonic(), user)
+    _cache.move_to_end(tg_id)
+    if user and user.get("bs_tag"):
+        _tag_index[user["bs_tag"]] = tg_id
+    while len(_cache) > USER_CACHE_SIZE:
+        _, (_, evicted) = _cache.popitem(last=False)
+        if evicted and _tag_index.get(evicted.get("bs_tag")) == evicted.get("tg_id"):
+            del _tag_index[evicted["bs_tag"]]
+
+def _clear():
+    _cache.clear()
+    _tag_index.clear()
+
+async def sync_epoch():
+    """
+    Сбрасывает локальный кэш, если другая реплика сменила эпоху. Не чаще раза в USER_EPOCH_CHECK.
+    """
+    global _epoch, _epoch_checked_at
+    now = time.monotonic()
+    if now - _epoch_checked_at < USER_EPOCH_CHECK:
+        return
+    _epoch_checked_at = now
+    epoch = await cache_epochs_repo.get(EPOCH_NAME)
+    if epoch != _epoch:
+        _clear()
+        _epoch = epoch
+
+async def _bump():
+    global _epoch
+    epoch = await cache_epochs_repo.bump(EPOCH_NAME)
+    # Если между нашими проверками эпоху меняли другие — их изменения мы тоже пропустили
+    if _epoch is None or epoch != _epoch + 1:
+        _clear()
+    _epoch = epoch
+
+async def get_user(tg_id: int):
+    """
+    Документ пользователя (или None, если не зарегистрирован). Отсутствие тоже кэшируется.
+    """
+    await sync_epoch()
+    entry = _cache.get(tg_id)
+    if entry and time.monotonic() - entry[0] < USER_CACHE_TTL:
+        _cache.move_to_end(tg_id)
+        return entry[1]
+    user = await users_repo.find_by_tg_id(tg_id)
+    _store(tg_id, user)
+    return user
+
+async def invalidate(tg_id: int):
+    entry = _cache.pop(tg_id, None)
+    if entry and entry[1]:
+        tag = entry[1].get("bs_tag")
+        if _tag_index.get(tag) == tg_id:
+            del _tag_index[tag]
+    await _bump()
+
+async def invalidate_tags(bs_tags):
+    for tag in bs_tags:
+        tg_id = _tag_index.pop(tag, None)
+        if tg_id is not None:
+            _cache.pop(tg_id, None)
+    await _bump()
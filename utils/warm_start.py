@@ -0,0 +1,63 @@
+# utils/warm_start.py
+"""
+Локальный снимок для быстрого старта: состав клубов, последний топ и конфиг сезона.
+Сохраняется периодически и при остановке, читается до первого апдейта.
+"""
+import os
+import time
+import logging
+from datetime import datetime, timezone
+from bson import json_util
+from bson.json_util import JSONOptions
+from utils import roster, season, leaderboard_snapshot
+
+WARM_START_PATH = os.getenv("WARM_START_PATH", "warm_start.json")
+# Снимок старше этого (сек) не используется
+WARM_START_MAX_AGE = float(os.getenv("WARM_START_MAX_AGE", "86400"))
+WARM_START_SAVE_SECONDS = float(os.getenv("WARM_START_SAVE_SECONDS", "300"))
+
+JSON_OPTIONS = JSONOptions(tz_aware=True, tzinfo=timezone.utc)
+
+def load() -> bool:
+    """
+    Заполняет кэши процесса из файла. False — файла нет, он повреждён или устарел.
+    """
+    try:
+        with open(WARM_START_PATH, encoding="utf-8") as f:
+            data = json_util.loads(f.read(), json_options=JSON_OPTIONS)
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError) as e:
+        logging.warning(f"⚠️ Снимок тёплого старта не прочитан: {e}")
+        return False
+
+    age = time.time() - data["saved_at"].timestamp()
+    if age > WARM_START_MAX_AGE:
+        logging.info(f"ℹ️ Снимок тёплого старта устарел ({age / 3600:.1f} ч), пропускаем.")
+        return False
+    if data.get("roster"):
+        roster.update_snapshot(data["roster"]["tags"], data["roster"]["synced_at"])
+    if data.get("leaderboard"):
+        leaderboard_snapshot.prime(data["leaderboard"])
+    if data.get("season"):
+        season.prime(data["season"])
+    return True
+
+async def save(context=None):
+    """
+    Атомарно перезаписывает файл снимка (JobQueue или остановка бота).
+    """
+    state = roster.snapshot()
+    data = {
+        "saved_at": datetime.now(timezone.utc),
+        "roster": {"tags": state[0], "synced_at": state[1]} if state else None,
+        "leaderboard": leaderboard_snapshot.current(),
+        "season": season.cached_config(),
+    }
+    tmp_path = WARM_START_PATH + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json_util.dumps(data, json_options=JSON_OPTIONS))
+        os.replace(tmp_path, WARM_START_PATH)
+    except OSError as e:
+        logging.error(f"❌ Не удалось сохранить снимок тёплого старта: {e}")
@@ -0,0 +1,104 @@
+# web/webhook.py
+"""
+Режим webhook: встроенный асинхронный HTTP-сервер (tornado) вместо long polling.
+
+Локальная проверка — отправить синтетический апдейт:
+    curl -X POST http://127.0.0.1:8443/telegram \
+         -H "Content-Type: application/json" \
+         -H "X-Telegram-Bot-Api-Secret-Token: $WEBHOOK_SECRET" \
+         -d '{"update_id": 1, "message": {"message_id": 1, "date": 0,
+              "chat": {"id": 1, "type": "private"}, "from": {"id": 1, "is_bot": false, "first_name": "T"},
+              "text": "/start", "entities": [{"type": "bot_command", "offset": 0, "length": 6}]}}'
+    curl http://127.0.0.1:8443/health
+"""
+import os
+import hmac
+import json
+import signal
+import asyncio
+import logging
+import tornado.web
+from telegram import Update
+from telegram.ext import Application
+
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+# Публичный адрес (https://bot.example.com); если не задан, setWebhook не вызывается —
+# удобно за балансировщиком, который регистрирует вебхук сам, и для локальных тестов
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+# Обязателен: без него любой, кто знает адрес, может слать боту поддельные апдейты
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+class WebhookHandler(tornado.web.RequestHandler):
+    def initialize(self, app: Application, secret_token: str):
+        self.app = app
+        self.secret_token = secret_token
+
+    async def post(self):
+        token = self.request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not hmac.compare_digest(token.encode(), self.secret_token.encode()):
+            self.set_status(403)
+            return
+        try:
+            data = json.loads(self.request.body)
+            update = Update.de_json(data, self.app.bot)
+        except Exception as e:
+            logging.warning(f"⚠️ Некорректный апдейт в вебхуке: {e}")
+            self.set_status(400)
+            return
+        await self.app.update_queue.put(update)
+        self.set_status(200)
+
+class HealthHandler(tornado.web.RequestHandler):
+    def initialize(self, app: Application):
+        self.app = app
+
+    def get(self):
+        self.set_status(200 if self.app.running else 503)
+        self.write({
+            "status": "ok" if self.app.running else "stopped",
+            "pending_updates": self.app.update_queue.qsize(),
+            "concurrent_updates": self.app.concurrent_updates
+        })
+
+def make_web_app(app: Application) -> tornado.web.Application:
+    return tornado.web.Application([
+        (WEBHOOK_PATH, WebhookHandler, {"app": app, "secret_token": WEBHOOK_SECRET}),
+        ("/health", HealthHandler, {"app": app}),
+    ])
+
+async def serve(app: Application):
+    """
+    Запускает бота в режиме webhook до SIGINT/SIGTERM.
+    post_init/post_shutdown вызываются здесь вручную: PTB делает это только в run_polling/run_webhook.
+    """
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET не задан — режим webhook без секрета не запускается")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with app:
+        if app.post_init:
+            await app.post_init(app)
+        if WEBHOOK_URL:
+            await app.bot.set_webhook(
+                url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=WEBHOOK_MAX_CONNECTIONS
+            )
+        await app.start()
+        server = make_web_app(app).listen(WEBHOOK_PORT, address=WEBHOOK_LISTEN)
+        logging.info(f"🌐 Webhook слушает {WEBHOOK_LISTEN}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+        try:
+            await stop.wait()
+        finally:
+            server.stop()
+            await app.stop()
+            if app.post_shutdown:
+                await app.post_shutdown(app)